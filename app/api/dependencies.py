@@ -1,28 +1,44 @@
-from typing import Generator
+from functools import lru_cache
 
 from app.services.ansible_service import AnsibleService
+from app.services.llm.base import LLMProvider
 from app.services.llm.factory import LLMProviderFactory
 
 
-def get_llm_factory() -> Generator[LLMProviderFactory, None, None]:
+@lru_cache(maxsize=1)
+def _llm_factory() -> LLMProviderFactory:
+    """Create the process-wide LLM provider factory."""
+    return LLMProviderFactory()
+
+
+@lru_cache(maxsize=1)
+def _ansible_service() -> AnsibleService:
+    """Create the process-wide Ansible service."""
+    return AnsibleService()
+
+
+async def get_llm_factory() -> LLMProviderFactory:
+    """
+    Dependency for getting the LLM provider factory instance.
+    
+    Declared as a plain coroutine so FastAPI resolves it inline on the
+    event loop instead of dispatching a generator to the threadpool.
+    """
+    return _llm_factory()
+
+
+async def get_ansible_service() -> AnsibleService:
     """
-    Dependency for getting an LLM provider factory instance.
+    Dependency for getting the Ansible service instance.
     """
-    factory = LLMProviderFactory()
-    try:
-        yield factory
-    finally:
-        # Clean up any resources if needed
-        factory.reset_provider()
+    return _ansible_service()
 
 
-def get_ansible_service() -> Generator[AnsibleService, None, None]:
+async def get_openai_service() -> LLMProvider:
     """
-    Dependency for getting an Ansible service instance.
+    Dependency for getting the preferred LLM provider.
+    
+    Kept for callers written against the former OpenAIService dependency;
+    the provider now comes from the shared LLM provider factory.
     """
-    service = AnsibleService()
-    try:
-        yield service
-    finally:
-        # Clean up any resources if needed
-        pass
+    return await _llm_factory().get_provider()
@@ -1,15 +1,14 @@
+import asyncio
 import logging
-from pathlib import Path
+import os
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile
 from fastapi.responses import FileResponse, JSONResponse
-from pydantic import ValidationError
 
 from app.api.dependencies import get_ansible_service, get_llm_factory
 from app.models.schemas import (
     ErrorResponse,
-    PlaybookFile,
     PlaybookRequest,
     PlaybookResponse,
     ValidationResult,
@@ -25,30 +24,44 @@ router = APIRouter()
 @router.post("/generate", response_model=PlaybookResponse)
 async def generate_playbook(
     request: PlaybookRequest,
+    x_batch_ok: bool = Header(False),
     llm_factory: LLMProviderFactory = Depends(get_llm_factory),
     ansible_service: AnsibleService = Depends(get_ansible_service)
 ):
     """
     Generate an Ansible playbook from a natural language description.
+    
+    Clients that can wait for a discounted OpenAI Batch API job can send an
+    X-Batch-OK: true header.
     """
     try:
         # Generate a unique ID for the playbook
         playbook_id = ansible_service.generate_playbook_id()
         
         # Get the LLM provider
-        llm_provider = llm_factory.get_provider()
+        llm_provider = await llm_factory.get_provider()
         
-        # Generate the playbook files using the available LLM provider
-        playbook_files = llm_provider.generate_ansible_playbook(
+        # Generate the playbook files, reusing cached files for repeat requests
+        playbook_files = await llm_factory.generate_ansible_playbook(
             request.description,
-            request.additional_context
+            request.additional_context,
+            allow_batch=x_batch_ok
         )
         
-        # Validate the playbook
-        validation_result = ansible_service.validate_playbook(playbook_files)
-        
         # Save the playbook files
-        ansible_service.save_playbook(playbook_id, playbook_files)
+        await asyncio.to_thread(ansible_service.save_playbook, playbook_id, playbook_files)
+        
+        # Validate the saved copy while the download archive is built
+        validation_result, archive_result = await asyncio.gather(
+            asyncio.to_thread(ansible_service.validate_saved_playbook, playbook_id, playbook_files),
+            asyncio.to_thread(ansible_service.create_playbook_archive, playbook_id),
+            return_exceptions=True,
+        )
+        if isinstance(validation_result, BaseException):
+            raise validation_result
+        if isinstance(archive_result, BaseException):
+            # The download endpoint builds the archive on demand, so this is not fatal
+            logger.warning("Could not prebuild the archive for playbook %s: %s", playbook_id, archive_result)
         
         # Create the download URL
         download_url = f"/api/download/{playbook_id}"
@@ -64,13 +77,13 @@ async def generate_playbook(
         )
         
     except Exception as e:
-        logger.error(f"Error generating playbook: {str(e)}")
+        logger.error("Error generating playbook: %s", e)
         raise HTTPException(
             status_code=500,
             detail=ErrorResponse(
                 detail=f"Failed to generate playbook: {str(e)}",
                 code="GENERATION_ERROR"
-            ).dict()
+            ).model_dump()
         )
 
 
@@ -83,9 +96,6 @@ async def download_playbook(
     Download a generated Ansible playbook as a ZIP archive.
     """
     try:
-        # Initialize the Ansible service
-        ansible_service = AnsibleService()
-        
         # Check if the playbook exists
         playbook_path = ansible_service.get_playbook_path(playbook_id)
         if not playbook_path:
@@ -94,37 +104,40 @@ async def download_playbook(
                 detail=ErrorResponse(
                     detail=f"Playbook with ID {playbook_id} not found",
                     code="PLAYBOOK_NOT_FOUND"
-                ).dict()
+                ).model_dump()
             )
         
         # Create a ZIP archive of the playbook
-        archive_path = ansible_service.create_playbook_archive(playbook_id)
+        archive_path = await asyncio.to_thread(ansible_service.create_playbook_archive, playbook_id)
         if not archive_path:
             raise HTTPException(
                 status_code=500,
                 detail=ErrorResponse(
                     detail=f"Failed to create archive for playbook {playbook_id}",
                     code="ARCHIVE_CREATION_ERROR"
-                ).dict()
+                ).model_dump()
             )
         
-        # Return the ZIP file
+        # Return the ZIP file. Passing the stat result up front sets the
+        # Content-Length header without Starlette stat'ing the file again in
+        # a worker thread, and the body is sent with sendfile where available.
         return FileResponse(
             path=archive_path,
             filename=f"ansible-playbook-{playbook_id}.zip",
-            media_type="application/zip"
+            media_type="application/zip",
+            stat_result=os.stat(archive_path)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error downloading playbook: {str(e)}")
+        logger.error("Error downloading playbook: %s", e)
         raise HTTPException(
             status_code=500,
             detail=ErrorResponse(
                 detail=f"Failed to download playbook: {str(e)}",
                 code="DOWNLOAD_ERROR"
-            ).dict()
+            ).model_dump()
         )
 
 
@@ -137,39 +150,21 @@ async def validate_playbook(
     Validate an uploaded Ansible playbook.
     """
     try:
-        
-        # Convert uploaded files to PlaybookFile objects
-        playbook_files = []
-        for file in files:
-            content = await file.read()
-            file_content = content.decode("utf-8")
-            
-            # Extract path from filename (e.g., "roles/example/tasks/main.yml")
-            filename = file.filename
-            if "/" in filename:
-                path = str(Path(filename).parent)
-                filename = Path(filename).name
-            else:
-                path = "."
-            
-            playbook_file = PlaybookFile(
-                filename=filename,
-                content=file_content,
-                path=path
-            )
-            playbook_files.append(playbook_file)
+        # Hand the spooled upload files to the service, which copies them to
+        # disk in chunks instead of reading each one into memory
+        uploads = [(file.filename, file.file) for file in files]
         
         # Validate the playbook
-        validation_result = ansible_service.validate_playbook(playbook_files)
+        validation_result = await asyncio.to_thread(ansible_service.validate_uploaded_playbook, uploads)
         
         return validation_result
         
     except Exception as e:
-        logger.error(f"Error validating playbook: {str(e)}")
+        logger.error("Error validating playbook: %s", e)
         raise HTTPException(
             status_code=500,
             detail=ErrorResponse(
                 detail=f"Failed to validate playbook: {str(e)}",
                 code="VALIDATION_ERROR"
-            ).dict()
+            ).model_dump()
         )
@@ -1,9 +1,10 @@
 import os
+from functools import cache, cached_property
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, FrozenSet, Optional
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,10 +23,23 @@ class Settings(BaseModel):
     
     # LLM settings
     PREFERRED_LLM_PROVIDER: str = os.getenv("PREFERRED_LLM_PROVIDER", "openai")
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "128"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_CACHE_DIR: Optional[Path] = Path(os.environ["LLM_CACHE_DIR"]) if os.getenv("LLM_CACHE_DIR") else None
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60)))
+    LLM_CATALOG_CACHE_FILE: Optional[Path] = (
+        Path(os.environ["LLM_CATALOG_CACHE_FILE"]).expanduser() if os.getenv("LLM_CATALOG_CACHE_FILE") else None
+    )
+    LLM_CATALOG_TTL: float = float(os.getenv("LLM_CATALOG_TTL", str(24 * 60 * 60)))
     
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+    OPENAI_API_BASE: str = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+    OPENAI_STRUCTURED_OUTPUTS: bool = os.getenv("OPENAI_STRUCTURED_OUTPUTS", "False").lower() in ("true", "1", "t")
+    LLM_BATCH_MIN_SIZE: int = int(os.getenv("LLM_BATCH_MIN_SIZE", "10"))
+    LLM_BATCH_WINDOW: float = float(os.getenv("LLM_BATCH_WINDOW", "30.0"))
+    LLM_BATCH_POLL_INTERVAL: float = float(os.getenv("LLM_BATCH_POLL_INTERVAL", "30.0"))
     
     # Ollama settings
     OLLAMA_API_BASE: str = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
@@ -33,11 +47,26 @@ class Settings(BaseModel):
     OLLAMA_TIMEOUT: float = float(os.getenv("OLLAMA_TIMEOUT", "120.0"))
     
     # Security settings
-    ALLOWED_HOSTS: List[str] = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
-    CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "http://localhost:8000,http://127.0.0.1:8000").split(",")
+    ALLOWED_HOSTS: FrozenSet[str] = Field(
+        default=os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1"),
+        validate_default=True,
+    )
+    CORS_ORIGINS: FrozenSet[str] = Field(
+        default=os.getenv("CORS_ORIGINS", "http://localhost:8000,http://127.0.0.1:8000"),
+        validate_default=True,
+    )
     
     # Ansible settings
     ANSIBLE_OUTPUT_DIR: Path = Path(os.getenv("ANSIBLE_OUTPUT_DIR", "ansible_output"))
+    ANSIBLE_LINT_WORKER: bool = os.getenv("ANSIBLE_LINT_WORKER", "True").lower() in ("true", "1", "t")
+    
+    @field_validator("ALLOWED_HOSTS", "CORS_ORIGINS", mode="before")
+    @classmethod
+    def split_comma_separated(cls, value: Any) -> Any:
+        """Parse a comma-separated environment value into a set of entries."""
+        if isinstance(value, str):
+            return frozenset(item.strip() for item in value.split(",") if item.strip())
+        return value
     
     @property
     def is_development(self) -> bool:
@@ -49,12 +78,37 @@ class Settings(BaseModel):
         """Check if the application is in production mode."""
         return self.APP_ENV.lower() == "production"
     
-    def get_ansible_output_path(self) -> Path:
-        """Get the absolute path to the Ansible output directory."""
+    @cached_property
+    def ansible_output_path(self) -> Path:
+        """Absolute path to the Ansible output directory, created on first access."""
         output_dir = BASE_DIR / self.ANSIBLE_OUTPUT_DIR
         output_dir.mkdir(exist_ok=True, parents=True)
         return output_dir
+    
+    @cached_property
+    def llm_cache_path(self) -> Optional[Path]:
+        """Absolute path to the on-disk LLM cache, or None if it is disabled."""
+        if self.LLM_CACHE_DIR is None:
+            return None
+        return BASE_DIR / self.LLM_CACHE_DIR
+    
+    @cached_property
+    def model_catalog_path(self) -> Optional[Path]:
+        """Absolute path to the model catalog cache file, or None if it is kept in memory only."""
+        if self.LLM_CATALOG_CACHE_FILE is None:
+            return None
+        return BASE_DIR / self.LLM_CATALOG_CACHE_FILE
+    
+    def get_ansible_output_path(self) -> Path:
+        """Get the absolute path to the Ansible output directory."""
+        return self.ansible_output_path
+
+
+@cache
+def get_settings() -> Settings:
+    """Get the process-wide settings instance."""
+    return Settings()
 
 
-# Create settings instance
-settings = Settings()
+# Module-level alias for code that imports the settings directly
+settings = get_settings()
@@ -1,23 +1,51 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import Depends, FastAPI, Request, Form, HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.dependencies import get_ansible_service, get_llm_factory
 from app.api.routes import router as api_router
-from app.config import settings
+from app.config import get_settings
 from app.models.schemas import PlaybookRequest
+from app.services.ansible_lint_worker import lint_worker
 from app.services.ansible_service import AnsibleService
+from app.services.llm.batch_dispatcher import batch_dispatcher
+from app.services.llm.clients import close_http_clients
 from app.services.llm.factory import LLMProviderFactory
 
+settings = get_settings()
+
 # Configure logging
 logging.basicConfig(
     level=logging.DEBUG if settings.DEBUG else logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start and stop the process-wide resources used by the application.
+    """
+    # Warm up ansible-lint so the first validation does not pay its startup cost
+    if settings.ANSIBLE_LINT_WORKER:
+        lint_worker.start()
+    batch_dispatcher.start()
+    
+    yield
+    
+    await batch_dispatcher.stop()
+    lint_worker.stop()
+    await close_http_clients()
+
 
 # Create the FastAPI app
 app = FastAPI(
@@ -26,6 +54,8 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs" if settings.is_development else None,
     redoc_url="/redoc" if settings.is_development else None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -46,6 +76,10 @@ app.mount(
 
 # Set up Jinja2 templates
 templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
+if not settings.is_development:
+    # Compile each template once instead of checking for changes on every render
+    templates.env.auto_reload = False
+    templates.env.bytecode_cache = FileSystemBytecodeCache()
 
 # Include API routes
 app.include_router(api_router, prefix="/api")
@@ -67,6 +101,8 @@ async def generate(
     request: Request,
     description: str = Form(...),
     additional_context: str = Form(None),
+    llm_factory: LLMProviderFactory = Depends(get_llm_factory),
+    ansible_service: AnsibleService = Depends(get_ansible_service),
 ):
     """
     Generate an Ansible playbook and display the results.
@@ -78,27 +114,32 @@ async def generate(
             additional_context=additional_context,
         )
         
-        # Initialize services
-        llm_factory = LLMProviderFactory()
-        ansible_service = AnsibleService()
-        
         # Generate a unique ID for the playbook
         playbook_id = ansible_service.generate_playbook_id()
         
         # Get the LLM provider
-        llm_provider = llm_factory.get_provider()
+        llm_provider = await llm_factory.get_provider()
         
-        # Generate the playbook files using the available LLM provider
-        playbook_files = llm_provider.generate_ansible_playbook(
+        # Generate the playbook files, reusing cached files for repeat requests
+        playbook_files = await llm_factory.generate_ansible_playbook(
             playbook_request.description,
             playbook_request.additional_context
         )
         
-        # Validate the playbook
-        validation_result = ansible_service.validate_playbook(playbook_files)
-        
         # Save the playbook files
-        ansible_service.save_playbook(playbook_id, playbook_files)
+        await asyncio.to_thread(ansible_service.save_playbook, playbook_id, playbook_files)
+        
+        # Validate the saved copy while the download archive is built
+        validation_result, archive_result = await asyncio.gather(
+            asyncio.to_thread(ansible_service.validate_saved_playbook, playbook_id, playbook_files),
+            asyncio.to_thread(ansible_service.create_playbook_archive, playbook_id),
+            return_exceptions=True,
+        )
+        if isinstance(validation_result, BaseException):
+            raise validation_result
+        if isinstance(archive_result, BaseException):
+            # The download endpoint builds the archive on demand, so this is not fatal
+            logger.warning("Could not prebuild the archive for playbook %s: %s", playbook_id, archive_result)
         
         # Create the download URL
         download_url = f"/api/download/{playbook_id}"
@@ -119,7 +160,7 @@ async def generate(
         )
         
     except Exception as e:
-        logging.error(f"Error generating playbook: {str(e)}")
+        logger.error("Error generating playbook: %s", e)
         return templates.TemplateResponse(
             "error.html",
             {
@@ -131,13 +172,12 @@ async def generate(
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(llm_factory: LLMProviderFactory = Depends(get_llm_factory)):
     """
     Health check endpoint.
     """
     # Check if any LLM provider is available
-    llm_factory = LLMProviderFactory()
-    available_providers = llm_factory.get_available_providers()
+    available_providers = await llm_factory.get_available_providers()
     
     return {
         "status": "ok",
@@ -146,6 +186,16 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics(llm_factory: LLMProviderFactory = Depends(get_llm_factory)):
+    """
+    Metrics endpoint.
+    """
+    return {
+        "llm_cache": llm_factory.cache.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     
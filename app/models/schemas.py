@@ -1,10 +1,12 @@
 from typing import Dict, List, Optional, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class PlaybookRequest(BaseModel):
     """Request model for generating an Ansible playbook."""
     
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     description: str = Field(
         ...,
         description="Natural language description of the Ansible task to perform",
@@ -20,6 +22,8 @@ class PlaybookRequest(BaseModel):
 class ValidationResult(BaseModel):
     """Model for ansible-lint validation results."""
     
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     is_valid: bool = Field(
         ...,
         description="Whether the playbook is valid according to ansible-lint"
@@ -34,6 +38,8 @@ class ValidationResult(BaseModel):
 class PlaybookFile(BaseModel):
     """Model representing an Ansible playbook file."""
     
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     filename: str = Field(
         ...,
         description="Name of the file"
@@ -53,6 +59,8 @@ class PlaybookFile(BaseModel):
 class PlaybookResponse(BaseModel):
     """Response model for a generated Ansible playbook."""
     
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     playbook_id: str = Field(
         ...,
         description="Unique identifier for the generated playbook"
@@ -87,6 +95,8 @@ class PlaybookResponse(BaseModel):
 class ErrorResponse(BaseModel):
     """Model for error responses."""
     
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     detail: str = Field(
         ...,
         description="Error message"
@@ -0,0 +1,296 @@
+"""
+Long-running ansible-lint worker.
+
+Starting ansible-lint means starting a Python interpreter, importing
+ansible-lint and ansible-core, and initialising the Ansible runtime. That
+costs a few seconds before any linting happens. The worker process pays
+that cost once: it imports ansible-lint, lints a small playbook to warm up,
+and then forks a child for each request. The child starts from the warm
+state and exits afterwards, so no state leaks between runs.
+
+The worker reads one JSON request per line on stdin, e.g. {"args": [...]}.
+It writes one JSON response per line on stdout, e.g.
+{"returncode": ..., "stdout": ..., "stderr": ...}.
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import selectors
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Directory containing the app package, so the worker module can be imported
+PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Playbook linted once at worker startup to load rules and the Ansible runtime
+WARMUP_PLAYBOOK = """---
+- name: Warm up ansible-lint
+  hosts: all
+  tasks:
+    - name: Ping
+      ansible.builtin.ping:
+"""
+
+# Longest time a lint request may take before the worker is considered stuck, in seconds
+WORKER_TIMEOUT = 120.0
+
+# Wait before restarting a failed worker, doubled after each failure up to the maximum, in seconds
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+
+
+class AnsibleLintWorker:
+    """
+    Client for a long-running ansible-lint worker process.
+    
+    The worker handles one request at a time. run() returns None instead of
+    blocking when the worker is busy, not running or too slow to answer, so
+    callers can fall back to a one-off ansible-lint subprocess. A worker that
+    fails is restarted by a later run(), waiting longer after each failure
+    so a crashing worker cannot spin.
+    """
+    
+    def __init__(self, command: Optional[List[str]] = None, timeout: float = WORKER_TIMEOUT):
+        """
+        Initialize the worker client.
+        
+        Args:
+            command: Command that starts the worker process, defaults to
+                running this module with the current interpreter
+            timeout: Longest wait for the answer to a request, in seconds; the
+                worker is stopped when it runs out
+        """
+        self.command = command or [sys.executable, "-m", "app.services.ansible_lint_worker"]
+        self.timeout = timeout
+        self._uses_ansiblelint = command is None
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._enabled = False
+        self._restart_delay = RESTART_DELAY
+        self._restart_at = 0.0
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if the worker process is running."""
+        return self._process is not None and self._process.poll() is None
+    
+    def start(self) -> bool:
+        """
+        Start the worker process if it is not already running.
+        
+        Returns:
+            True if the worker is running, False if it cannot be used here
+        """
+        if self.is_running:
+            return True
+        
+        if not hasattr(os, "fork"):
+            logger.info("ansible-lint worker requires os.fork, using one-off ansible-lint runs")
+            return False
+        if self._uses_ansiblelint and importlib.util.find_spec("ansiblelint") is None:
+            logger.info("ansible-lint is not importable, using one-off ansible-lint runs")
+            return False
+        
+        self._enabled = True
+        return self._spawn()
+    
+    def stop(self) -> None:
+        """Stop the worker process and keep run() from restarting it."""
+        self._enabled = False
+        self._terminate()
+    
+    def _spawn(self) -> bool:
+        """Start a new worker process, scheduling a retry if it cannot be started."""
+        try:
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_DIR), env.get("PYTHONPATH")]))
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                env=env,
+            )
+        except OSError as e:
+            logger.warning("Could not start ansible-lint worker: %s", e)
+            self._process = None
+            self._schedule_restart()
+            return False
+        
+        logger.info("Started ansible-lint worker (pid %s)", self._process.pid)
+        return True
+    
+    def _terminate(self) -> None:
+        """Stop the current worker process, if any."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        
+        # Closing stdin asks the worker to exit; its stdout is closed once it has
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+    
+    def run(self, args: List[str]) -> Optional[subprocess.CompletedProcess]:
+        """
+        Run ansible-lint in the worker.
+        
+        Args:
+            args: ansible-lint command line arguments, without the program name
+        
+        Returns:
+            The completed run, or None if the worker is busy, not running or
+            did not answer in time
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        
+        try:
+            # Hold on to the process, as stop() may clear it from another thread
+            process = self._process
+            if process is None or process.poll() is not None:
+                process = self._restart()
+                if process is None:
+                    return None
+            
+            process.stdin.write(json.dumps({"args": args}) + "\n")
+            process.stdin.flush()
+            response = json.loads(self._read_line(process, time.monotonic() + self.timeout))
+            self._restart_delay = RESTART_DELAY
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning("ansible-lint worker failed, falling back to one-off runs: %s", e)
+            if self._process is process:
+                self._terminate()
+                self._schedule_restart()
+            return None
+        finally:
+            self._lock.release()
+        
+        return subprocess.CompletedProcess(
+            ["ansible-lint", *args],
+            response["returncode"],
+            stdout=response["stdout"],
+            stderr=response["stderr"],
+        )
+    
+    def _restart(self) -> Optional[subprocess.Popen]:
+        """Replace a worker that has gone away, once its restart delay has passed."""
+        if not self._enabled or time.monotonic() < self._restart_at:
+            return None
+        
+        self._terminate()
+        logger.info("Restarting ansible-lint worker")
+        return self._process if self._spawn() else None
+    
+    def _schedule_restart(self) -> None:
+        """Hold off the next restart, backing off further after each failure."""
+        self._restart_at = time.monotonic() + self._restart_delay
+        self._restart_delay = min(self._restart_delay * 2, MAX_RESTART_DELAY)
+    
+    @staticmethod
+    def _read_line(process: subprocess.Popen, deadline: float) -> str:
+        """
+        Read one response line from the worker without blocking past the deadline.
+        
+        Raises:
+            TimeoutError: If the line is not complete by the deadline
+            EOFError: If the worker exits before answering
+        """
+        fd = process.stdout.fileno()
+        buffer = b""
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while not buffer.endswith(b"\n"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    raise TimeoutError("ansible-lint worker did not answer in time")
+                chunk = os.read(fd, 64 * 1024)
+                if not chunk:
+                    raise EOFError("ansible-lint worker exited")
+                buffer += chunk
+        return buffer.decode("utf-8")
+
+
+# Process-wide worker, started with the application
+lint_worker = AnsibleLintWorker()
+
+
+def _lint(main, args: List[str]) -> dict:
+    """Run the ansible-lint entry point and capture its result."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            returncode = main(["ansible-lint", *args])
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            print(f"ansible-lint failed: {e}", file=sys.stderr)
+            returncode = 1
+    return {"returncode": returncode, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+def _lint_in_child(main, args: List[str]) -> dict:
+    """Run ansible-lint in a forked child so the worker state stays clean."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        # ansible-lint adds a root logging handler on every run
+        logging.getLogger().handlers.clear()
+        with os.fdopen(write_fd, "w") as pipe:
+            pipe.write(json.dumps(_lint(main, args)))
+        os._exit(0)
+    
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        data = pipe.read()
+    os.waitpid(pid, 0)
+    
+    if not data:
+        return {"returncode": 1, "stdout": "", "stderr": "ansible-lint worker child exited unexpectedly"}
+    return json.loads(data)
+
+
+def serve() -> None:
+    """Serve lint requests from stdin until it is closed."""
+    # Keep the protocol on a private descriptor so anything ansible-lint or
+    # Ansible writes to stdout directly cannot corrupt it
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    
+    from ansiblelint.__main__ import main
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        warmup_path = Path(temp_dir) / "site.yml"
+        warmup_path.write_text(WARMUP_PLAYBOOK)
+        _lint(main, [str(warmup_path), "-p"])
+    logging.getLogger().handlers.clear()
+    
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        protocol.write(json.dumps(_lint_in_child(main, request["args"])) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    serve()
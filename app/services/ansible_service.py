@@ -1,101 +1,104 @@
 import json
 import logging
 import os
+import re
 import shutil
 import subprocess
 import tempfile
 import uuid
+import zipfile
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
-from app.config import settings
+from app.config import get_settings
 from app.models.schemas import PlaybookFile, ValidationResult
+from app.services.ansible_lint_worker import lint_worker
 
 logger = logging.getLogger(__name__)
 
+# File names recognised as the main playbook at the top of a playbook
+MAIN_PLAYBOOK_NAMES = frozenset({"site.yml", "playbook.yml", "main.yml"})
+
+# Playbook IDs as made by generate_playbook_id; anything else could name a path outside the output directory
+PLAYBOOK_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Buffer size used when copying uploaded files to disk
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# File types that are already compressed and are stored as-is in archives
+COMPRESSED_SUFFIXES = frozenset({
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".jar", ".whl",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+})
+
 
 class AnsibleService:
     """Service for Ansible operations and validation."""
     
     def __init__(self):
         """Initialize the Ansible service."""
-        self.output_dir = settings.get_ansible_output_path()
+        self.output_dir = get_settings().get_ansible_output_path()
+        self.lint_worker = lint_worker
     
-    def validate_playbook(self, playbook_files: List[PlaybookFile]) -> ValidationResult:
+    def validate_uploaded_playbook(self, uploads: List[Tuple[str, BinaryIO]]) -> ValidationResult:
         """
-        Validate an Ansible playbook using ansible-lint.
+        Validate uploaded playbook files using ansible-lint.
+        
+        Each upload is copied to a temporary directory in fixed-size chunks,
+        so files are never held in memory as a whole. Filenames may include
+        relative directories, which become the file's path; uploads with a
+        missing, absolute or ".." name are rejected so they cannot be written
+        outside the temporary directory.
         
         Args:
-            playbook_files: List of PlaybookFile objects representing the playbook
+            uploads: List of (filename, file object) pairs
             
         Returns:
             ValidationResult object with validation status and messages
         """
-        # Create a temporary directory to store the playbook files
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_path = Path(temp_dir)
+            root = temp_path.resolve()
             
-            # Write the playbook files to the temporary directory
-            main_playbook_path = None
-            for playbook_file in playbook_files:
-                file_path = temp_path / playbook_file.path / playbook_file.filename
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                file_path.write_text(playbook_file.content)
+            file_locations = []
+            for filename, fileobj in uploads:
+                relative_path = Path(filename or "")
+                if not relative_path.name or relative_path.is_absolute() or ".." in relative_path.parts:
+                    return self._invalid_upload(filename)
                 
-                # Identify the main playbook file (usually site.yml or playbook.yml)
-                if playbook_file.filename in ["site.yml", "playbook.yml", "main.yml"] and playbook_file.path == ".":
-                    main_playbook_path = file_path
-            
-            # If no main playbook file was found, use the first YAML file
-            if not main_playbook_path:
-                for playbook_file in playbook_files:
-                    if playbook_file.filename.endswith((".yml", ".yaml")):
-                        main_playbook_path = temp_path / playbook_file.path / playbook_file.filename
-                        break
+                file_path = (temp_path / relative_path).resolve()
+                if not file_path.is_relative_to(root):
+                    return self._invalid_upload(filename)
+                
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                with file_path.open("wb") as output:
+                    shutil.copyfileobj(fileobj, output, UPLOAD_CHUNK_SIZE)
+                file_locations.append((str(relative_path.parent), relative_path.name))
             
-            if not main_playbook_path:
-                return ValidationResult(
-                    is_valid=False,
-                    messages=["No playbook YAML file found in the generated files."]
-                )
+            return self._lint_playbook(temp_path, file_locations)
+    
+    @staticmethod
+    def _invalid_upload(filename: Optional[str]) -> ValidationResult:
+        """Build the validation result for an upload with an unsafe filename."""
+        logger.warning("Rejected uploaded file with invalid name: %r", filename)
+        return ValidationResult(
+            is_valid=False,
+            messages=[f"Invalid upload filename: {filename!r}. Use relative paths inside the playbook."]
+        )
+    
+    def validate_saved_playbook(self, playbook_id: str, playbook_files: List[PlaybookFile]) -> ValidationResult:
+        """
+        Validate a playbook that was already saved with save_playbook.
+        
+        Args:
+            playbook_id: Unique identifier for the playbook
+            playbook_files: List of PlaybookFile objects that were saved
             
-            # Run ansible-lint
-            try:
-                result = subprocess.run(
-                    ["ansible-lint", str(main_playbook_path), "-p"],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                # Parse the output
-                if result.returncode == 0:
-                    return ValidationResult(
-                        is_valid=True,
-                        messages=["Playbook validation successful."]
-                    )
-                else:
-                    # Extract error messages
-                    error_lines = result.stdout.splitlines() + result.stderr.splitlines()
-                    filtered_errors = [line for line in error_lines if line.strip()]
-                    
-                    return ValidationResult(
-                        is_valid=False,
-                        messages=filtered_errors
-                    )
-                    
-            except subprocess.SubprocessError as e:
-                logger.error(f"Error running ansible-lint: {str(e)}")
-                return ValidationResult(
-                    is_valid=False,
-                    messages=[f"Error running ansible-lint: {str(e)}"]
-                )
-            except Exception as e:
-                logger.error(f"Unexpected error during playbook validation: {str(e)}")
-                return ValidationResult(
-                    is_valid=False,
-                    messages=[f"Unexpected error during validation: {str(e)}"]
-                )
+        Returns:
+            ValidationResult object with validation status and messages
+        """
+        playbook_dir = self.output_dir / playbook_id
+        return self._lint_playbook(playbook_dir, self._file_locations(playbook_files))
     
     def save_playbook(self, playbook_id: str, playbook_files: List[PlaybookFile]) -> Path:
         """
@@ -113,10 +116,10 @@ class AnsibleService:
         playbook_dir.mkdir(parents=True, exist_ok=True)
         
         # Write the playbook files
-        for playbook_file in playbook_files:
-            file_path = playbook_dir / playbook_file.path / playbook_file.filename
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(playbook_file.content)
+        self._write_playbook_files(playbook_dir, playbook_files)
+        
+        # Drop any archive built from a previous version of the playbook
+        (self.output_dir / f"{playbook_id}.zip").unlink(missing_ok=True)
         
         return playbook_dir
     
@@ -130,18 +133,34 @@ class AnsibleService:
         Returns:
             Path to the created archive, or None if the playbook doesn't exist
         """
-        playbook_dir = self.output_dir / playbook_id
-        if not playbook_dir.exists():
+        playbook_dir = self.get_playbook_path(playbook_id)
+        if playbook_dir is None:
             return None
         
-        # Create a ZIP archive
+        # Playbooks are not modified after they are saved, so an existing
+        # archive can be served again as-is
         archive_path = self.output_dir / f"{playbook_id}.zip"
-        shutil.make_archive(
-            str(archive_path.with_suffix("")),  # Remove .zip extension for make_archive
-            "zip",
-            root_dir=str(playbook_dir),
-            base_dir="."
-        )
+        if archive_path.exists():
+            return archive_path
+        
+        # Write to a temporary file and move it into place so concurrent
+        # downloads never see a partially written archive
+        with tempfile.NamedTemporaryFile(dir=self.output_dir, suffix=".zip.tmp", delete=False) as temp_file:
+            with zipfile.ZipFile(temp_file, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+                for file_path in sorted(playbook_dir.rglob("*")):
+                    if not file_path.is_file():
+                        continue
+                    compression = (
+                        zipfile.ZIP_STORED
+                        if file_path.suffix.lower() in COMPRESSED_SUFFIXES
+                        else zipfile.ZIP_DEFLATED
+                    )
+                    archive.write(
+                        file_path,
+                        arcname=file_path.relative_to(playbook_dir).as_posix(),
+                        compress_type=compression,
+                    )
+        os.replace(temp_file.name, archive_path)
         
         return archive_path
     
@@ -153,8 +172,12 @@ class AnsibleService:
             playbook_id: Unique identifier for the playbook
             
         Returns:
-            Path to the playbook directory, or None if it doesn't exist
+            Path to the playbook directory, or None if it doesn't exist or the
+            ID is not a valid playbook ID
         """
+        if not PLAYBOOK_ID_PATTERN.fullmatch(playbook_id):
+            return None
+        
         playbook_dir = self.output_dir / playbook_id
         return playbook_dir if playbook_dir.exists() else None
     
@@ -165,4 +188,124 @@ class AnsibleService:
         Returns:
             Unique playbook ID
         """
-        return str(uuid.uuid4())
+        return uuid.uuid4().hex
+    
+    def _write_playbook_files(self, root: Path, playbook_files: List[PlaybookFile]) -> None:
+        """
+        Write the playbook files below a root directory.
+        
+        Args:
+            root: Directory to write the files into
+            playbook_files: List of PlaybookFile objects representing the playbook
+        """
+        # Create each parent directory once rather than once per file
+        file_paths = [root / playbook_file.path / playbook_file.filename for playbook_file in playbook_files]
+        for parent in {file_path.parent for file_path in file_paths}:
+            parent.mkdir(parents=True, exist_ok=True)
+        
+        for file_path, playbook_file in zip(file_paths, playbook_files):
+            file_path.write_text(playbook_file.content)
+    
+    def _file_locations(self, playbook_files: List[PlaybookFile]) -> List[Tuple[str, str]]:
+        """Get the (path, filename) pairs of a list of playbook files."""
+        return [(playbook_file.path, playbook_file.filename) for playbook_file in playbook_files]
+    
+    def _find_main_playbook(self, root: Path, file_locations: List[Tuple[str, str]]) -> Optional[Path]:
+        """
+        Find the playbook file ansible-lint should be run against.
+        
+        Args:
+            root: Directory the playbook files were written to
+            file_locations: (path, filename) pairs of the playbook files
+            
+        Returns:
+            Path to the main playbook file, or None if there is no YAML file
+        """
+        main_playbook_path = None
+        for path, filename in file_locations:
+            # Identify the main playbook file (usually site.yml or playbook.yml)
+            if filename in MAIN_PLAYBOOK_NAMES and path == ".":
+                main_playbook_path = root / path / filename
+        
+        # If no main playbook file was found, use the first YAML file
+        if not main_playbook_path:
+            for path, filename in file_locations:
+                if filename.endswith((".yml", ".yaml")):
+                    main_playbook_path = root / path / filename
+                    break
+        
+        return main_playbook_path
+    
+    def _lint_playbook(self, root: Path, file_locations: List[Tuple[str, str]]) -> ValidationResult:
+        """
+        Run ansible-lint against playbook files that are already on disk.
+        
+        Args:
+            root: Directory the playbook files were written to
+            file_locations: (path, filename) pairs of the playbook files
+            
+        Returns:
+            ValidationResult object with validation status and messages
+        """
+        main_playbook_path = self._find_main_playbook(root, file_locations)
+        if not main_playbook_path:
+            return ValidationResult(
+                is_valid=False,
+                messages=["No playbook YAML file found in the generated files."]
+            )
+        
+        # Run ansible-lint
+        try:
+            result = self._run_ansible_lint([str(main_playbook_path), "-p"])
+            
+            # Parse the output
+            if result.returncode == 0:
+                return ValidationResult(
+                    is_valid=True,
+                    messages=["Playbook validation successful."]
+                )
+            else:
+                # Extract error messages
+                error_lines = result.stdout.splitlines() + result.stderr.splitlines()
+                filtered_errors = [line for line in error_lines if line.strip()]
+                
+                return ValidationResult(
+                    is_valid=False,
+                    messages=filtered_errors
+                )
+                
+        except subprocess.SubprocessError as e:
+            logger.error("Error running ansible-lint: %s", e)
+            return ValidationResult(
+                is_valid=False,
+                messages=[f"Error running ansible-lint: {str(e)}"]
+            )
+        except Exception as e:
+            logger.error("Unexpected error during playbook validation: %s", e)
+            return ValidationResult(
+                is_valid=False,
+                messages=[f"Unexpected error during validation: {str(e)}"]
+            )
+    
+    def _run_ansible_lint(self, args: List[str]) -> subprocess.CompletedProcess:
+        """
+        Run ansible-lint, preferring the long-running worker when it is free.
+        
+        Args:
+            args: ansible-lint command line arguments, without the program name
+            
+        Returns:
+            The completed ansible-lint run
+        """
+        # Both paths get the same arguments, so messages never carry ANSI colours
+        args = ["--nocolor", *args]
+        result = self.lint_worker.run(args)
+        if result is not None:
+            return result
+        
+        return subprocess.run(
+            ["ansible-lint", *args],
+            capture_output=True,
+            text=True,
+            check=False
+        )
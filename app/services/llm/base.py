@@ -2,10 +2,12 @@
 Base class for LLM providers.
 """
 
+import hashlib
 from abc import ABC, abstractmethod
 from typing import List, Optional
 
 from app.models.schemas import PlaybookFile
+from app.services.llm.cache import LLMCache
 
 
 class LLMProvider(ABC):
@@ -16,13 +18,19 @@ class LLMProvider(ABC):
     """
     
     @abstractmethod
-    def generate_ansible_playbook(self, description: str, additional_context: Optional[str] = None) -> List[PlaybookFile]:
+    async def generate_ansible_playbook(
+        self,
+        description: str,
+        additional_context: Optional[str] = None,
+        allow_batch: bool = False,
+    ) -> List[PlaybookFile]:
         """
         Generate an Ansible playbook from a natural language description.
         
         Args:
             description: Natural language description of the Ansible task
             additional_context: Additional context or requirements for the playbook
+            allow_batch: Whether the request may wait for a discounted batch job
             
         Returns:
             List of PlaybookFile objects representing the generated playbook files
@@ -50,7 +58,7 @@ class LLMProvider(ABC):
         pass
     
     @abstractmethod
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         """
         Check if the LLM provider is available.
         
@@ -58,3 +66,44 @@ class LLMProvider(ABC):
             True if the provider is available, False otherwise
         """
         pass
+    
+    def get_cache_key(self, description: str, additional_context: Optional[str] = None) -> str:
+        """
+        Build the response cache key for a playbook request.
+        
+        Args:
+            description: Natural language description of the Ansible task
+            additional_context: Additional context or requirements for the playbook
+            
+        Returns:
+            Cache key covering the provider, the model and the prompts sent to it
+        """
+        return LLMCache.cache_key(
+            self.get_provider_name(),
+            self.get_model_name(),
+            self._get_system_prompt_digest(),
+            self._construct_prompt(description, additional_context),
+        )
+    
+    @abstractmethod
+    def _get_system_prompt(self) -> str:
+        """Get the system prompt for the provider's API."""
+        pass
+    
+    def _get_system_prompt_digest(self) -> bytes:
+        """Get the SHA-256 digest of the system prompt."""
+        return hashlib.sha256(self._get_system_prompt().encode("utf-8")).digest()
+    
+    @abstractmethod
+    def _construct_prompt(self, description: str, additional_context: Optional[str] = None) -> str:
+        """
+        Construct the user prompt for the provider's API.
+        
+        Args:
+            description: Natural language description of the Ansible task
+            additional_context: Additional context or requirements for the playbook
+            
+        Returns:
+            Formatted prompt string
+        """
+        pass
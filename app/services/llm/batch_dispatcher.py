@@ -0,0 +1,223 @@
+"""
+OpenAI Batch API dispatcher.
+
+Playbook generations that can tolerate a long wait are pooled across
+concurrent requests and submitted to the OpenAI Batch API as a single job,
+which is billed at half the price of individual chat completion calls.
+Requests are collected until batch_min_size are waiting or batch_window
+seconds have passed, then uploaded as one JSONL file. The batch is polled
+until it finishes and each result is handed back to the request that
+submitted it.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+from app.config import settings
+from app.services.llm.clients import get_openai_http_client
+
+logger = logging.getLogger(__name__)
+
+# Endpoint every request in a batch is sent to
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Batch statuses after which the batch will not change any more
+TERMINAL_BATCH_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchDispatcher:
+    """
+    Pools chat completion requests into OpenAI Batch API jobs.
+    
+    The dispatcher must be started from a running event loop. Callers
+    should check is_running and call the API directly when it is not.
+    """
+    
+    def __init__(
+        self,
+        batch_min_size: int = 10,
+        batch_window: float = 30.0,
+        poll_interval: float = 30.0,
+    ):
+        """
+        Initialize the dispatcher.
+        
+        Args:
+            batch_min_size: Number of waiting requests that triggers a batch immediately
+            batch_window: Longest time a request waits for others to join its batch, in seconds
+            poll_interval: Time between batch status checks, in seconds
+        """
+        self.batch_min_size = batch_min_size
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if the flusher task is running."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self) -> None:
+        """Start the flusher task on the running event loop."""
+        if self.is_running:
+            return
+        
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self) -> None:
+        """Stop the flusher and fail any requests that have not completed."""
+        tasks = [task for task in [self._task, *self._batches] if task is not None]
+        self._task = None
+        
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        pending, self._pending = self._pending, []
+        self._fail(pending, ValueError("OpenAI batch dispatcher stopped"))
+    
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a chat completion request for the next batch.
+        
+        Args:
+            payload: Chat completion request body
+        
+        Returns:
+            The chat completion response body
+        
+        Raises:
+            ValueError: If the batch fails or returns no result for the request
+        """
+        if not self.is_running:
+            raise ValueError("OpenAI batch dispatcher is not running")
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((payload, future))
+        
+        # Wake the flusher to start the batch window, or to flush a full batch
+        if len(self._pending) == 1 or len(self._pending) >= self.batch_min_size:
+            self._wakeup.set()
+        
+        return await future
+    
+    async def _flush_loop(self) -> None:
+        """Collect pending requests into batches and dispatch them."""
+        while True:
+            self._wakeup.clear()
+            if not self._pending:
+                await self._wakeup.wait()
+                continue
+            
+            if len(self._pending) < self.batch_min_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.batch_window)
+                except asyncio.TimeoutError:
+                    pass
+            
+            batch, self._pending = self._pending, []
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Run one batch and resolve the futures of its requests."""
+        try:
+            results = await self._run_batch([payload for payload, _ in batch])
+        except asyncio.CancelledError:
+            self._fail(batch, ValueError("OpenAI batch dispatcher stopped"))
+            raise
+        except Exception as e:
+            logger.error("OpenAI batch of %s requests failed: %s", len(batch), e)
+            self._fail(batch, ValueError(f"OpenAI batch failed: {str(e)}"))
+            return
+        
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = results.get(str(index))
+            if result is None:
+                future.set_exception(ValueError("OpenAI batch returned no result for the request"))
+            else:
+                future.set_result(result)
+    
+    async def _run_batch(self, payloads: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Submit payloads as one batch job and wait for it to finish.
+        
+        Args:
+            payloads: Chat completion request bodies
+        
+        Returns:
+            Response bodies of the successful requests, keyed by their index as a string
+        """
+        client = get_openai_http_client()
+        
+        lines = b"\n".join(
+            orjson.dumps({"custom_id": str(index), "method": "POST", "url": BATCH_ENDPOINT, "body": payload})
+            for index, payload in enumerate(payloads)
+        )
+        response = await client.post(
+            "/files",
+            headers=self.headers,
+            data={"purpose": "batch"},
+            files={"file": ("playbooks.jsonl", lines, "application/jsonl")},
+        )
+        response.raise_for_status()
+        input_file_id = response.json()["id"]
+        
+        response = await client.post(
+            "/batches",
+            headers=self.headers,
+            json={"input_file_id": input_file_id, "endpoint": BATCH_ENDPOINT, "completion_window": "24h"},
+        )
+        response.raise_for_status()
+        batch = response.json()
+        logger.info("Submitted OpenAI batch %s with %s requests", batch["id"], len(payloads))
+        
+        while batch["status"] not in TERMINAL_BATCH_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            response = await client.get(f"/batches/{batch['id']}", headers=self.headers)
+            response.raise_for_status()
+            batch = response.json()
+        
+        if batch["status"] != "completed":
+            raise ValueError(f"batch {batch['id']} ended with status {batch['status']}")
+        if not batch.get("output_file_id"):
+            return {}
+        
+        response = await client.get(f"/files/{batch['output_file_id']}/content", headers=self.headers)
+        response.raise_for_status()
+        
+        results = {}
+        for line in response.content.splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            item_response = item.get("response") or {}
+            if item_response.get("status_code") == 200:
+                results[item["custom_id"]] = item_response["body"]
+        return results
+    
+    @staticmethod
+    def _fail(batch: List[Tuple[Dict[str, Any], asyncio.Future]], error: Exception) -> None:
+        """Fail the futures of a batch that are still waiting."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+# Process-wide dispatcher, started with the application
+batch_dispatcher = BatchDispatcher(
+    batch_min_size=settings.LLM_BATCH_MIN_SIZE,
+    batch_window=settings.LLM_BATCH_WINDOW,
+    poll_interval=settings.LLM_BATCH_POLL_INTERVAL,
+)
@@ -0,0 +1,181 @@
+"""
+Response cache for generated playbooks.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.models.schemas import PlaybookFile
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    LRU cache of generated playbook files, optionally backed by disk.
+    
+    Entries are keyed by a SHA-256 hash of the provider, the model and the
+    exact prompts sent to it, so identical requests skip the LLM round-trip
+    and changing a prompt invalidates the old entries. With a cache
+    directory, entries are also written there as JSON and survive restarts.
+    """
+    
+    def __init__(self, max_size: int = 128, cache_dir: Optional[Path] = None, ttl: float = 7 * 24 * 60 * 60):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of entries to keep in memory; 0 disables the cache
+            cache_dir: Directory for the on-disk cache, or None to keep entries in memory only
+            ttl: How long entries stay valid, in seconds
+        """
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, List[PlaybookFile]]]" = OrderedDict()
+        
+        if self.cache_dir is not None and self.max_size > 0:
+            self.cache_dir.mkdir(exist_ok=True, parents=True)
+    
+    @staticmethod
+    def cache_key(provider: str, model: str, system_prompt_digest: bytes, prompt: str) -> str:
+        """
+        Build the cache key for a playbook request.
+        
+        Args:
+            provider: Name of the LLM provider
+            model: Name of the model
+            system_prompt_digest: SHA-256 digest of the system prompt sent to the model
+            prompt: User prompt sent to the model
+        
+        Returns:
+            Hex-encoded SHA-256 digest identifying the request
+        """
+        key = hashlib.sha256(system_prompt_digest)
+        key.update(
+            orjson.dumps(
+                {
+                    "provider": provider,
+                    "model": model,
+                    "prompt": prompt,
+                },
+                option=orjson.OPT_SORT_KEYS,
+            )
+        )
+        return key.hexdigest()
+    
+    def get(self, key: str) -> Optional[List[PlaybookFile]]:
+        """
+        Look up the playbook files cached for a key.
+        
+        Args:
+            key: Cache key built by cache_key
+        
+        Returns:
+            The cached playbook files, or None on a cache miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None and self._is_expired(entry[0]):
+            del self._entries[key]
+            entry = None
+        
+        if entry is None:
+            entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(entry[1])
+    
+    def set(self, key: str, files: List[PlaybookFile]) -> None:
+        """
+        Store the playbook files generated for a key.
+        
+        Args:
+            key: Cache key built by cache_key
+            files: Generated playbook files
+        """
+        if self.max_size <= 0:
+            return
+        
+        entry = (time.time(), list(files))
+        self._remember(key, entry)
+        self._store(key, entry[1])
+    
+    def clear(self) -> None:
+        """Remove all cached entries, including those on disk."""
+        self._entries.clear()
+        if self.cache_dir is not None:
+            for path in self.cache_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache statistics.
+        
+        Returns:
+            Dictionary with the cache size, capacity, hits and misses
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+    
+    def _is_expired(self, stored_at: float) -> bool:
+        """Check if an entry stored at the given time is past the TTL."""
+        return time.time() - stored_at >= self.ttl
+    
+    def _remember(self, key: str, entry: Tuple[float, List[PlaybookFile]]) -> None:
+        """Keep an entry in memory, evicting the least recently used ones."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def _load(self, key: str) -> Optional[Tuple[float, List[PlaybookFile]]]:
+        """Read an entry from the on-disk cache, if present and still valid."""
+        if self.cache_dir is None or self.max_size <= 0:
+            return None
+        
+        path = self.cache_dir / f"{key}.json"
+        try:
+            stored_at = path.stat().st_mtime
+            if self._is_expired(stored_at):
+                path.unlink(missing_ok=True)
+                return None
+            files = [PlaybookFile(**data) for data in orjson.loads(path.read_bytes())]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Ignoring unreadable LLM cache entry %s: %s", path, e)
+            return None
+        
+        return stored_at, files
+    
+    def _store(self, key: str, files: List[PlaybookFile]) -> None:
+        """Write an entry to the on-disk cache."""
+        if self.cache_dir is None:
+            return
+        
+        data = orjson.dumps([file.model_dump() for file in files])
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as tmp:
+                tmp.write(data)
+            os.replace(tmp.name, self.cache_dir / f"{key}.json")
+        except OSError as e:
+            logger.warning("Could not write LLM cache entry %s: %s", key, e)
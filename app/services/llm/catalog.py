@@ -0,0 +1,120 @@
+"""
+Cache of the models offered by each LLM provider.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+import orjson
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCatalog:
+    """
+    Stale-while-revalidate cache of provider model catalogs.
+    
+    A catalog younger than max_age is served without touching the network.
+    An older one is still served, while a refresh runs in the background, so
+    availability checks only wait on the network the first time a provider
+    is seen. Catalogs are kept in memory and, with a path, in a JSON file
+    that survives restarts. Failed fetches are not cached.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, max_age: float = 24 * 60 * 60):
+        """
+        Initialize the catalog cache.
+        
+        Args:
+            path: JSON file to persist catalogs in, or None to keep them in memory only
+            max_age: Age after which a catalog is refreshed, in seconds
+        """
+        self.path = path
+        self.max_age = max_age
+        self._entries: Dict[str, Tuple[float, FrozenSet[str]]] = self._read()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+    
+    async def get_models(self, key: str, fetch: Callable[[], Awaitable[Iterable[str]]]) -> FrozenSet[str]:
+        """
+        Get the model names cached for a provider.
+        
+        Args:
+            key: Identifies the provider and endpoint the catalog belongs to
+            fetch: Coroutine function that fetches the model names from the provider
+        
+        Returns:
+            The model names offered by the provider
+        
+        Raises:
+            Exception: Whatever fetch raises, when there is no cached catalog to fall back to
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self._refresh(key, fetch)
+        
+        checked_at, models = entry
+        if time.time() - checked_at >= self.max_age and key not in self._refreshing:
+            task = asyncio.create_task(self._refresh(key, fetch))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda done: self._refresh_done(key, done))
+        return models
+    
+    def clear(self) -> None:
+        """Forget all cached catalogs."""
+        self._entries.clear()
+        self._write()
+    
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Iterable[str]]]) -> FrozenSet[str]:
+        """Fetch a provider catalog and cache it."""
+        models = frozenset(await fetch())
+        self._entries[key] = (time.time(), models)
+        self._write()
+        return models
+    
+    def _refresh_done(self, key: str, task: asyncio.Task) -> None:
+        """Clean up after a background refresh, keeping the stale catalog if it failed."""
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not refresh the model catalog for %s: %s", key, task.exception())
+    
+    def _read(self) -> Dict[str, Tuple[float, FrozenSet[str]]]:
+        """Load the persisted catalogs."""
+        if self.path is None:
+            return {}
+        
+        try:
+            data = orjson.loads(self.path.read_bytes())
+            return {key: (entry["checked_at"], frozenset(entry["models"])) for key, entry in data.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning("Ignoring unreadable model catalog cache %s: %s", self.path, e)
+            return {}
+    
+    def _write(self) -> None:
+        """Persist the cached catalogs."""
+        if self.path is None:
+            return
+        
+        data = orjson.dumps({
+            key: {"checked_at": checked_at, "models": sorted(models)}
+            for key, (checked_at, models) in self._entries.items()
+        })
+        try:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            with tempfile.NamedTemporaryFile(dir=self.path.parent, suffix=".tmp", delete=False) as tmp:
+                tmp.write(data)
+            os.replace(tmp.name, self.path)
+        except OSError as e:
+            logger.warning("Could not write the model catalog cache %s: %s", self.path, e)
+
+
+# Process-wide catalog cache shared by the providers
+model_catalog = ModelCatalog(settings.model_catalog_path, settings.LLM_CATALOG_TTL)
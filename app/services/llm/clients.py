@@ -0,0 +1,154 @@
+"""
+Shared HTTP clients for LLM providers.
+"""
+
+import asyncio
+import importlib.util
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+# HTTP/2 lets concurrent OpenAI requests share one connection, but needs the h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Connection pool limits for the OpenAI API client
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=10)
+
+# Timeout for OpenAI API requests, matching the OpenAI SDK default
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+# Headers for requests whose body is pre-serialized with orjson
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Connection pool limits for the Ollama API client
+OLLAMA_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# Responses worth retrying: rate limits and transient server errors
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Retries after a retryable response, and the longest wait between two attempts
+MAX_RETRIES = 5
+MAX_RETRY_DELAY = 30.0
+
+# Immediate retries for connections that could not be established
+CONNECT_RETRIES = 2
+
+_openai_http_client: Optional[httpx.AsyncClient] = None
+_ollama_http_client: Optional[httpx.AsyncClient] = None
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that retries rate-limited and transiently failing requests.
+    
+    Retries reuse the pooled connection and only re-send the request, so a
+    single 429 or 503 does not fail a whole playbook generation. The wait
+    between attempts grows exponentially with jitter, and a Retry-After
+    header from the server takes precedence.
+    """
+    
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = 0.1,
+        **transport_kwargs,
+    ):
+        """
+        Initialize the transport.
+        
+        Args:
+            transport: Transport that sends the requests, defaults to a pooled
+                AsyncHTTPTransport built from transport_kwargs
+            max_retries: Number of retries after a retryable response
+            backoff: Wait before the first retry, in seconds
+        """
+        self.transport = transport or httpx.AsyncHTTPTransport(retries=CONNECT_RETRIES, **transport_kwargs)
+        self.max_retries = max_retries
+        self.backoff = backoff
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, retrying retryable responses."""
+        for attempt in range(self.max_retries):
+            response = await self.transport.handle_async_request(request)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            
+            delay = self._retry_delay(response, attempt)
+            await response.aclose()
+            await asyncio.sleep(delay)
+        
+        return await self.transport.handle_async_request(request)
+    
+    async def aclose(self) -> None:
+        """Close the underlying transport."""
+        await self.transport.aclose()
+    
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Get the wait before the next attempt, honouring Retry-After."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), MAX_RETRY_DELAY)
+        
+        return min(self.backoff * 2 ** attempt + random.random() * 0.05, MAX_RETRY_DELAY)
+
+
+def get_openai_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide HTTP client used for OpenAI API requests.
+    
+    Returns:
+        The shared httpx.AsyncClient bound to the OpenAI API base URL, created on first use
+    """
+    global _openai_http_client
+    
+    if _openai_http_client is None or _openai_http_client.is_closed:
+        _openai_http_client = httpx.AsyncClient(
+            base_url=settings.OPENAI_API_BASE,
+            timeout=OPENAI_HTTP_TIMEOUT,
+            transport=RetryTransport(http2=HTTP2_AVAILABLE, limits=OPENAI_HTTP_LIMITS),
+        )
+    return _openai_http_client
+
+
+def get_ollama_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide HTTP client used for Ollama API requests.
+    
+    Returns:
+        The shared httpx.AsyncClient bound to the Ollama API base URL, created on first use
+    """
+    global _ollama_http_client
+    
+    if _ollama_http_client is None or _ollama_http_client.is_closed:
+        _ollama_http_client = httpx.AsyncClient(
+            base_url=settings.OLLAMA_API_BASE,
+            timeout=settings.OLLAMA_TIMEOUT,
+            transport=RetryTransport(limits=OLLAMA_HTTP_LIMITS),
+        )
+    return _ollama_http_client
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients."""
+    global _openai_http_client, _ollama_http_client
+    
+    if _openai_http_client is not None:
+        await _openai_http_client.aclose()
+        _openai_http_client = None
+    if _ollama_http_client is not None:
+        await _ollama_http_client.aclose()
+        _ollama_http_client = None
@@ -2,17 +2,28 @@
 LLM provider factory.
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Optional, Type
+import time
+from typing import Dict, List, Optional, Tuple, Type
+
+import httpx
 
 from app.config import settings
 from app.models.schemas import PlaybookFile
 from app.services.llm.base import LLMProvider
+from app.services.llm.cache import LLMCache
 from app.services.llm.openai_provider import OpenAIProvider
 from app.services.llm.ollama_provider import OllamaProvider
 
 logger = logging.getLogger(__name__)
 
+# How long the result of get_available_providers and the chosen provider are reused, in seconds
+AVAILABILITY_CACHE_TTL = 30.0
+
+# HTTP statuses meaning the provider rejected our credentials, so another may be picked
+AUTH_ERROR_STATUSES = {401, 403}
+
 
 class LLMProviderFactory:
     """
@@ -26,9 +37,17 @@ class LLMProviderFactory:
             "ollama": OllamaProvider,
         }
         self.preferred_provider = settings.PREFERRED_LLM_PROVIDER.lower()
-        self._active_provider: Optional[LLMProvider] = None
+        self._active_provider: Optional[Tuple[float, LLMProvider]] = None
+        self._provider_instances: Dict[str, LLMProvider] = {}
+        self._availability_cache: Optional[Tuple[float, List[str]]] = None
+        self._inflight: Dict[Tuple[str, bool], "asyncio.Task[List[PlaybookFile]]"] = {}
+        self.cache = LLMCache(
+            max_size=settings.LLM_CACHE_SIZE,
+            cache_dir=settings.llm_cache_path,
+            ttl=settings.LLM_CACHE_TTL,
+        )
     
-    def get_provider(self) -> LLMProvider:
+    async def get_provider(self) -> LLMProvider:
         """
         Get an LLM provider instance.
         
@@ -38,43 +57,51 @@ class LLMProviderFactory:
         Raises:
             ValueError: If no provider is available
         """
-        # If we already have an active provider, return it
+        # Reuse the provider picked recently, so a provider that comes back or goes away is noticed
         if self._active_provider is not None:
-            return self._active_provider
-        
-        # Try to use the preferred provider first
-        if self.preferred_provider in self.providers:
-            provider_class = self.providers[self.preferred_provider]
-            provider = provider_class()
-            
-            if provider.is_available():
-                logger.info(f"Using preferred LLM provider: {provider.get_provider_name()} with model: {provider.get_model_name()}")
-                self._active_provider = provider
+            checked_at, provider = self._active_provider
+            if time.monotonic() - checked_at < AVAILABILITY_CACHE_TTL:
                 return provider
-            else:
-                logger.warning(f"Preferred LLM provider '{self.preferred_provider}' is not available")
         
-        # Try all providers in order
-        for provider_name, provider_class in self.providers.items():
-            if provider_name == self.preferred_provider:
-                continue  # Skip the preferred provider as we already tried it
+        # Probe all providers at once, then pick the preferred one or the first fallback
+        provider_names = sorted(self.providers, key=lambda name: name != self.preferred_provider)
+        providers = [self._get_provider_instance(provider_name) for provider_name in provider_names]
+        availability = await asyncio.gather(*(provider.is_available() for provider in providers))
+        
+        for provider_name, provider, available in zip(provider_names, providers, availability):
+            if not available:
+                if provider_name == self.preferred_provider:
+                    logger.warning("Preferred LLM provider '%s' is not available", self.preferred_provider)
+                continue
             
-            provider = provider_class()
-            if provider.is_available():
-                logger.info(f"Using fallback LLM provider: {provider.get_provider_name()} with model: {provider.get_model_name()}")
-                self._active_provider = provider
-                return provider
+            if provider_name == self.preferred_provider:
+                logger.info("Using preferred LLM provider: %s with model: %s", provider.get_provider_name(), provider.get_model_name())
+            else:
+                logger.info("Using fallback LLM provider: %s with model: %s", provider.get_provider_name(), provider.get_model_name())
+            self._active_provider = (time.monotonic(), provider)
+            return provider
         
         # No provider is available
         raise ValueError("No LLM provider is available. Please check your configuration.")
     
-    def generate_ansible_playbook(self, description: str, additional_context: Optional[str] = None) -> List[PlaybookFile]:
+    async def generate_ansible_playbook(
+        self,
+        description: str,
+        additional_context: Optional[str] = None,
+        allow_batch: bool = False,
+    ) -> List[PlaybookFile]:
         """
         Generate an Ansible playbook using the available LLM provider.
         
+        Requests that would send the same prompts to the same provider and
+        model are served from the response cache instead of calling the LLM
+        again. Identical requests that arrive while one is still being
+        generated wait for its result rather than making their own call.
+        
         Args:
             description: Natural language description of the Ansible task
             additional_context: Additional context or requirements for the playbook
+            allow_batch: Whether the request may wait for a discounted batch job
             
         Returns:
             List of PlaybookFile objects representing the generated playbook files
@@ -82,25 +109,100 @@ class LLMProviderFactory:
         Raises:
             ValueError: If no provider is available
         """
-        provider = self.get_provider()
-        return provider.generate_ansible_playbook(description, additional_context)
+        provider = await self.get_provider()
+        
+        cache_key = provider.get_cache_key(description, additional_context)
+        playbook_files = self.cache.get(cache_key)
+        if playbook_files is not None:
+            return playbook_files
+        
+        # Join an identical generation already in flight, or start one. Batched
+        # and direct requests are kept apart so neither waits on the other.
+        inflight_key = (cache_key, allow_batch)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.create_task(
+                self._generate(provider, cache_key, description, additional_context, allow_batch)
+            )
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(inflight_key, None))
+        
+        # Shielded so a caller that disconnects does not cancel the call for the others
+        return list(await asyncio.shield(task))
+    
+    async def _generate(
+        self,
+        provider: LLMProvider,
+        cache_key: str,
+        description: str,
+        additional_context: Optional[str],
+        allow_batch: bool,
+    ) -> List[PlaybookFile]:
+        """Generate a playbook with a provider and cache the result, unless it is empty."""
+        try:
+            playbook_files = await provider.generate_ansible_playbook(description, additional_context, allow_batch)
+        except Exception as e:
+            # Pick the provider afresh next time if this one could not be reached or refused us
+            if _is_provider_failure(e):
+                logger.warning("LLM provider %s failed, choosing the provider again: %s", provider.get_provider_name(), e)
+                self.reset_provider()
+            raise
+        if playbook_files:
+            self.cache.set(cache_key, playbook_files)
+        return playbook_files
     
-    def get_available_providers(self) -> List[str]:
+    async def get_available_providers(self) -> List[str]:
         """
         Get a list of available LLM providers.
         
         Returns:
             List of available provider names
         """
-        available_providers = []
+        # Reuse a recent result instead of probing every provider again
+        if self._availability_cache is not None:
+            checked_at, available_providers = self._availability_cache
+            if time.monotonic() - checked_at < AVAILABILITY_CACHE_TTL:
+                return list(available_providers)
         
-        for provider_name, provider_class in self.providers.items():
-            provider = provider_class()
-            if provider.is_available():
-                available_providers.append(provider_name)
+        provider_names = list(self.providers)
+        availability = await asyncio.gather(
+            *(self._get_provider_instance(provider_name).is_available() for provider_name in provider_names)
+        )
+        available_providers = [
+            provider_name for provider_name, available in zip(provider_names, availability) if available
+        ]
         
-        return available_providers
+        self._availability_cache = (time.monotonic(), available_providers)
+        return list(available_providers)
     
     def reset_provider(self) -> None:
-        """Reset the active provider."""
+        """Reset the active provider and the cached provider availability."""
         self._active_provider = None
+        self._availability_cache = None
+    
+    def _get_provider_instance(self, provider_name: str) -> LLMProvider:
+        """
+        Get the shared instance of a provider, creating it on first use.
+        
+        Args:
+            provider_name: Name of the provider, as registered in self.providers
+            
+        Returns:
+            The provider instance
+        """
+        provider = self._provider_instances.get(provider_name)
+        if provider is None:
+            provider = self.providers[provider_name]()
+            self._provider_instances[provider_name] = provider
+        return provider
+
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """Check if an error, or the HTTP error it was raised from, means the provider is unusable."""
+    while error is not None:
+        if isinstance(error, httpx.RequestError):
+            return True
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in AUTH_ERROR_STATUSES:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
@@ -2,19 +2,28 @@
 Ollama provider implementation.
 """
 
-import json
+import asyncio
 import logging
 import httpx
+import orjson
 from typing import List, Optional, Dict, Any
 
-from pydantic import ValidationError
-
 from app.config import settings
 from app.models.schemas import PlaybookFile
 from app.services.llm.base import LLMProvider
+from app.services.llm.catalog import model_catalog
+from app.services.llm.clients import JSON_HEADERS, get_ollama_http_client
+from app.services.llm.prompts import JSON_FORMAT_REMINDER, PROMPT_SUFFIX, SYSTEM_PROMPT, SYSTEM_PROMPT_SHA256, construct_prompt
+from app.services.llm.streaming import PlaybookStreamParser
 
 logger = logging.getLogger(__name__)
 
+# Limits concurrent Ollama API calls; requests beyond it wait for a free slot
+_request_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+# Local models follow the response format more reliably when it is repeated
+OLLAMA_PROMPT_SUFFIX = PROMPT_SUFFIX + JSON_FORMAT_REMINDER
+
 
 class OllamaProvider(LLMProvider):
     """
@@ -23,19 +32,36 @@ class OllamaProvider(LLMProvider):
     This provider uses the Ollama API to generate Ansible playbooks using locally hosted models.
     """
     
-    def __init__(self):
-        """Initialize the Ollama provider."""
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize the Ollama provider.
+        
+        Args:
+            client: HTTP client bound to the Ollama API, defaults to the shared client
+        """
         self.api_base = settings.OLLAMA_API_BASE
         self.model = settings.OLLAMA_MODEL
         self.timeout = settings.OLLAMA_TIMEOUT
+        self._client = client
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the HTTP client bound to the Ollama API, fetching the shared one on each use."""
+        return self._client if self._client is not None else get_ollama_http_client()
     
-    def generate_ansible_playbook(self, description: str, additional_context: Optional[str] = None) -> List[PlaybookFile]:
+    async def generate_ansible_playbook(
+        self,
+        description: str,
+        additional_context: Optional[str] = None,
+        allow_batch: bool = False,
+    ) -> List[PlaybookFile]:
         """
         Generate an Ansible playbook from a natural language description using Ollama.
         
         Args:
             description: Natural language description of the Ansible task
             additional_context: Additional context or requirements for the playbook
+            allow_batch: Ignored, Ollama has no batch API
             
         Returns:
             List of PlaybookFile objects representing the generated playbook files
@@ -50,7 +76,8 @@ class OllamaProvider(LLMProvider):
                 "model": self.model,
                 "prompt": prompt,
                 "system": system_prompt,
-                "stream": False,
+                "stream": True,
+                "format": "json",
                 "options": {
                     "temperature": 0.2,
                     "top_p": 1.0,
@@ -58,24 +85,34 @@ class OllamaProvider(LLMProvider):
                 }
             }
             
-            # Call the Ollama API
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(f"{self.api_base}/api/generate", json=payload)
+            # Call the Ollama API, parsing the files as the reply streams in
+            parser = PlaybookStreamParser(self.get_provider_name())
+            async with _request_slots, self.client.stream(
+                "POST",
+                "/api/generate",
+                content=orjson.dumps(payload),
+                headers=JSON_HEADERS,
+                timeout=self.timeout,
+            ) as response:
+                if response.is_error:
+                    await response.aread()
                 response.raise_for_status()
-                result = response.json()
+                
+                # One JSON object per line, each carrying the next piece of the reply
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        parser.feed(orjson.loads(line).get("response", ""))
             
-            # Extract and parse the response
-            content = result.get("response", "")
-            return self._parse_response(content)
+            return parser.close()
             
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error when calling Ollama API: {e.response.status_code} - {e.response.text}")
+            logger.error("HTTP error when calling Ollama API: %s - %s", e.response.status_code, e.response.text)
             raise ValueError(f"Ollama API error: {e.response.status_code} - {e.response.text}")
         except httpx.RequestError as e:
-            logger.error(f"Error making request to Ollama API: {str(e)}")
+            logger.error("Error making request to Ollama API: %s", e)
             raise ValueError(f"Failed to connect to Ollama API: {str(e)}")
         except Exception as e:
-            logger.error(f"Error generating Ansible playbook with Ollama: {str(e)}")
+            logger.error("Error generating Ansible playbook with Ollama: %s", e)
             raise
     
     def get_provider_name(self) -> str:
@@ -96,7 +133,7 @@ class OllamaProvider(LLMProvider):
         """
         return self.model
     
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         """
         Check if the Ollama provider is available.
         
@@ -108,55 +145,31 @@ class OllamaProvider(LLMProvider):
             return False
         
         try:
-            # Make a simple API call to check if Ollama is running
-            with httpx.Client(timeout=5.0) as client:
-                response = client.get(f"{self.api_base}/api/tags")
-                response.raise_for_status()
-                
-                # Check if the specified model is available
-                models = response.json().get("models", [])
-                model_names = [model.get("name") for model in models]
-                
-                if self.model not in model_names:
-                    logger.warning(f"Ollama model '{self.model}' is not available. Available models: {', '.join(model_names)}")
-                    return False
-                
-                return True
+            # Check if the specified model is available, using the cached model list
+            model_names = await model_catalog.get_models(f"ollama:{self.api_base}", self._fetch_model_names)
+            
+            if self.model not in model_names:
+                logger.warning("Ollama model '%s' is not available. Available models: %s", self.model, ', '.join(sorted(model_names)))
+                return False
+            
+            return True
         except Exception as e:
-            logger.warning(f"Ollama provider is not available: {str(e)}")
+            logger.warning("Ollama provider is not available: %s", e)
             return False
     
+    async def _fetch_model_names(self) -> List[str]:
+        """Fetch the names of the models installed in Ollama."""
+        response = await self.client.get("/api/tags", timeout=5.0)
+        response.raise_for_status()
+        return [model["name"] for model in orjson.loads(response.content).get("models", []) if model.get("name")]
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the Ollama API."""
-        return """
-        You are an expert Ansible playbook generator. Your task is to create complete, valid Ansible playbooks based on natural language descriptions.
-        
-        Follow these guidelines:
-        1. Create all necessary files for a complete Ansible playbook, including main playbook YAML, roles, tasks, handlers, templates, etc.
-        2. Use best practices for Ansible playbook structure and organization.
-        3. Include comments to explain complex tasks or configurations.
-        4. Ensure the playbook is idempotent and follows Ansible lint rules.
-        5. Return your response in a structured JSON format with each file as a separate object.
-        
-        Your response must be a valid JSON array where each object has the following properties:
-        - filename: The name of the file
-        - content: The complete content of the file
-        - path: The relative path within the playbook structure
-        
-        Example response format:
-        [
-            {
-                "filename": "site.yml",
-                "content": "---\\n# Main playbook\\n- name: Example playbook\\n  hosts: all\\n  roles:\\n    - example_role",
-                "path": "."
-            },
-            {
-                "filename": "tasks.yml",
-                "content": "---\\n- name: Install package\\n  apt:\\n    name: nginx\\n    state: present",
-                "path": "roles/example_role/tasks"
-            }
-        ]
-        """
+        return SYSTEM_PROMPT
+    
+    def _get_system_prompt_digest(self) -> bytes:
+        """Get the SHA-256 digest of the system prompt, computed once at import."""
+        return SYSTEM_PROMPT_SHA256
     
     def _construct_prompt(self, description: str, additional_context: Optional[str] = None) -> str:
         """
@@ -169,63 +182,4 @@ class OllamaProvider(LLMProvider):
         Returns:
             Formatted prompt string
         """
-        prompt = f"Generate a complete Ansible playbook for the following task:\n\n{description}\n\n"
-        
-        if additional_context:
-            prompt += f"Additional context:\n{additional_context}\n\n"
-        
-        prompt += """
-        Please provide all necessary files for a complete Ansible playbook, including:
-        1. Main playbook YAML file
-        2. Any roles, tasks, handlers, templates, variables, etc.
-        3. README.md with usage instructions
-        
-        Ensure the playbook follows Ansible best practices and is properly structured.
-        
-        Your response must be a valid JSON array where each object has the following properties:
-        - filename: The name of the file
-        - content: The complete content of the file
-        - path: The relative path within the playbook structure
-        """
-        
-        return prompt
-    
-    def _parse_response(self, content: str) -> List[PlaybookFile]:
-        """
-        Parse the Ollama API response into PlaybookFile objects.
-        
-        Args:
-            content: Response content from the Ollama API
-            
-        Returns:
-            List of PlaybookFile objects
-        """
-        try:
-            # Extract JSON from the response
-            # Sometimes the API might return markdown-formatted JSON
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                json_str = content.split("```")[1].strip()
-            else:
-                json_str = content.strip()
-            
-            # Parse the JSON
-            files_data = json.loads(json_str)
-            
-            # Convert to PlaybookFile objects
-            playbook_files = []
-            for file_data in files_data:
-                playbook_file = PlaybookFile(
-                    filename=file_data["filename"],
-                    content=file_data["content"],
-                    path=file_data["path"]
-                )
-                playbook_files.append(playbook_file)
-            
-            return playbook_files
-            
-        except (json.JSONDecodeError, ValidationError, KeyError) as e:
-            logger.error(f"Error parsing Ollama response: {str(e)}")
-            logger.debug(f"Raw response content: {content}")
-            raise ValueError(f"Failed to parse Ollama response: {str(e)}")
+        return construct_prompt(description, additional_context, OLLAMA_PROMPT_SUFFIX)
@@ -2,37 +2,109 @@
 OpenAI provider implementation.
 """
 
-import json
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from openai import OpenAI
-from pydantic import ValidationError
+import httpx
+import orjson
+from pydantic import TypeAdapter, ValidationError
 
 from app.config import settings
 from app.models.schemas import PlaybookFile
 from app.services.llm.base import LLMProvider
+from app.services.llm.batch_dispatcher import batch_dispatcher
+from app.services.llm.catalog import model_catalog
+from app.services.llm.clients import JSON_HEADERS, get_openai_http_client
+from app.services.llm.prompts import SYSTEM_PROMPT, SYSTEM_PROMPT_SHA256, construct_prompt
+from app.services.llm.streaming import PlaybookStreamParser
 
 logger = logging.getLogger(__name__)
 
+# Limits concurrent OpenAI API calls; requests beyond it wait for a free slot
+_request_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+# Validates a parsed list of files into PlaybookFile objects
+_PLAYBOOK_FILES_ADAPTER = TypeAdapter(List[PlaybookFile])
+
+
+def _playbook_response_format() -> Dict[str, Any]:
+    """
+    Build the structured outputs response format for a playbook reply.
+    
+    Strict mode needs an object at the top level and forbids unlisted
+    properties, so the files are wrapped in a "files" key as in JSON mode.
+    
+    Returns:
+        The response_format value enforcing the PlaybookFile schema
+    """
+    file_schema = {**PlaybookFile.model_json_schema(), "additionalProperties": False}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "playbook_files",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"files": {"type": "array", "items": file_schema}},
+                "required": ["files"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+# Response formats, built once rather than per request
+_JSON_OBJECT_RESPONSE_FORMAT = {"type": "json_object"}
+_PLAYBOOK_RESPONSE_FORMAT = _playbook_response_format()
+
 
 class OpenAIProvider(LLMProvider):
     """
     OpenAI provider implementation.
+    
+    This provider calls the OpenAI REST API directly on the shared connection
+    pool rather than going through the OpenAI SDK.
     """
     
-    def __init__(self):
-        """Initialize the OpenAI client."""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize the OpenAI provider.
+        
+        Args:
+            client: HTTP client bound to the OpenAI API, defaults to the shared client
+        """
+        self._client = client
         self.model = settings.OPENAI_MODEL
+        self.headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}", **JSON_HEADERS}
+        self.response_format = (
+            _PLAYBOOK_RESPONSE_FORMAT if settings.OPENAI_STRUCTURED_OUTPUTS else _JSON_OBJECT_RESPONSE_FORMAT
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Get the HTTP client bound to the OpenAI API.
+        
+        The shared client is looked up on every use rather than kept, so a
+        client closed at application shutdown is replaced on the next call.
+        """
+        return self._client if self._client is not None else get_openai_http_client()
     
-    def generate_ansible_playbook(self, description: str, additional_context: Optional[str] = None) -> List[PlaybookFile]:
+    async def generate_ansible_playbook(
+        self,
+        description: str,
+        additional_context: Optional[str] = None,
+        allow_batch: bool = False,
+    ) -> List[PlaybookFile]:
         """
         Generate an Ansible playbook from a natural language description using OpenAI.
         
         Args:
             description: Natural language description of the Ansible task
             additional_context: Additional context or requirements for the playbook
+            allow_batch: Whether the request may wait for a discounted Batch API job
             
         Returns:
             List of PlaybookFile objects representing the generated playbook files
@@ -41,28 +113,68 @@ class OpenAIProvider(LLMProvider):
             # Construct the prompt
             prompt = self._construct_prompt(description, additional_context)
             
-            # Call the OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            # Prepare the request payload
+            payload = {
+                "model": self.model,
+                "messages": [
                     {"role": "system", "content": self._get_system_prompt()},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.2,
-                max_tokens=4000,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0
-            )
+                "temperature": 0.2,
+                "max_tokens": 4000,
+                "top_p": 1,
+                "frequency_penalty": 0,
+                "presence_penalty": 0,
+                "response_format": self.response_format,
+            }
             
-            # Extract and parse the response
-            content = response.choices[0].message.content
-            return self._parse_response(content)
+            # Wait for a batch job if the caller can, otherwise stream the reply
+            if allow_batch and batch_dispatcher.is_running:
+                result = await batch_dispatcher.submit(payload)
+                return self._parse_response(result["choices"][0]["message"]["content"])
             
+            return await self._stream_chat_completion(payload)
+            
+        except httpx.HTTPStatusError as e:
+            logger.error("HTTP error when calling OpenAI API: %s - %s", e.response.status_code, e.response.text)
+            raise ValueError(f"OpenAI API error: {e.response.status_code} - {e.response.text}")
+        except httpx.RequestError as e:
+            logger.error("Error making request to OpenAI API: %s", e)
+            raise ValueError(f"Failed to connect to OpenAI API: {str(e)}")
         except Exception as e:
-            logger.error(f"Error generating Ansible playbook with OpenAI: {str(e)}")
+            logger.error("Error generating Ansible playbook with OpenAI: %s", e)
             raise
     
+    async def _stream_chat_completion(self, payload: Dict[str, Any]) -> List[PlaybookFile]:
+        """
+        Stream a chat completion and parse the files as they arrive.
+        
+        Args:
+            payload: Chat completion request body
+            
+        Returns:
+            List of PlaybookFile objects parsed from the reply
+        """
+        parser = PlaybookStreamParser(self.get_provider_name())
+        body = orjson.dumps({**payload, "stream": True})
+        
+        async with _request_slots, self.client.stream("POST", "/chat/completions", content=body, headers=self.headers) as response:
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            
+            # Server-sent events, each carrying the next piece of the reply
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                for choice in orjson.loads(data).get("choices", []):
+                    parser.feed(choice.get("delta", {}).get("content"))
+        
+        return parser.close()
+    
     def get_provider_name(self) -> str:
         """
         Get the name of the LLM provider.
@@ -81,7 +193,7 @@ class OpenAIProvider(LLMProvider):
         """
         return self.model
     
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         """
         Check if the OpenAI provider is available.
         
@@ -93,44 +205,31 @@ class OpenAIProvider(LLMProvider):
             return False
         
         try:
-            # Make a simple API call to check if the API key is valid
-            self.client.models.list()
+            # Check if the API key is valid, using the cached model list
+            await model_catalog.get_models(self._catalog_key(), self._fetch_model_ids)
             return True
         except Exception as e:
-            logger.warning(f"OpenAI provider is not available: {str(e)}")
+            logger.warning("OpenAI provider is not available: %s", e)
             return False
     
+    def _catalog_key(self) -> str:
+        """Identify the endpoint and API key the model catalog was fetched with."""
+        key_hash = hashlib.sha256(settings.OPENAI_API_KEY.encode("utf-8")).hexdigest()[:16]
+        return f"openai:{self.client.base_url}:{key_hash}"
+    
+    async def _fetch_model_ids(self) -> List[str]:
+        """Fetch the IDs of the models the API key can use."""
+        response = await self.client.get("/models", headers=self.headers, timeout=5.0)
+        response.raise_for_status()
+        return [model["id"] for model in orjson.loads(response.content).get("data", [])]
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the OpenAI API."""
-        return """
-        You are an expert Ansible playbook generator. Your task is to create complete, valid Ansible playbooks based on natural language descriptions.
-        
-        Follow these guidelines:
-        1. Create all necessary files for a complete Ansible playbook, including main playbook YAML, roles, tasks, handlers, templates, etc.
-        2. Use best practices for Ansible playbook structure and organization.
-        3. Include comments to explain complex tasks or configurations.
-        4. Ensure the playbook is idempotent and follows Ansible lint rules.
-        5. Return your response in a structured JSON format with each file as a separate object.
-        
-        Your response must be a valid JSON array where each object has the following properties:
-        - filename: The name of the file
-        - content: The complete content of the file
-        - path: The relative path within the playbook structure
-        
-        Example response format:
-        [
-            {
-                "filename": "site.yml",
-                "content": "---\\n# Main playbook\\n- name: Example playbook\\n  hosts: all\\n  roles:\\n    - example_role",
-                "path": "."
-            },
-            {
-                "filename": "tasks.yml",
-                "content": "---\\n- name: Install package\\n  apt:\\n    name: nginx\\n    state: present",
-                "path": "roles/example_role/tasks"
-            }
-        ]
-        """
+        return SYSTEM_PROMPT
+    
+    def _get_system_prompt_digest(self) -> bytes:
+        """Get the SHA-256 digest of the system prompt, computed once at import."""
+        return SYSTEM_PROMPT_SHA256
     
     def _construct_prompt(self, description: str, additional_context: Optional[str] = None) -> str:
         """
@@ -143,21 +242,7 @@ class OpenAIProvider(LLMProvider):
         Returns:
             Formatted prompt string
         """
-        prompt = f"Generate a complete Ansible playbook for the following task:\n\n{description}\n\n"
-        
-        if additional_context:
-            prompt += f"Additional context:\n{additional_context}\n\n"
-        
-        prompt += """
-        Please provide all necessary files for a complete Ansible playbook, including:
-        1. Main playbook YAML file
-        2. Any roles, tasks, handlers, templates, variables, etc.
-        3. README.md with usage instructions
-        
-        Ensure the playbook follows Ansible best practices and is properly structured.
-        """
-        
-        return prompt
+        return construct_prompt(description, additional_context)
     
     def _parse_response(self, content: str) -> List[PlaybookFile]:
         """
@@ -170,31 +255,14 @@ class OpenAIProvider(LLMProvider):
             List of PlaybookFile objects
         """
         try:
-            # Extract JSON from the response
-            # Sometimes the API might return markdown-formatted JSON
-            if "```json" in content:
-                json_str = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                json_str = content.split("```")[1].strip()
-            else:
-                json_str = content.strip()
-            
-            # Parse the JSON
-            files_data = json.loads(json_str)
-            
-            # Convert to PlaybookFile objects
-            playbook_files = []
-            for file_data in files_data:
-                playbook_file = PlaybookFile(
-                    filename=file_data["filename"],
-                    content=file_data["content"],
-                    path=file_data["path"]
-                )
-                playbook_files.append(playbook_file)
+            # The response is requested in JSON mode, so it can be parsed directly
+            data = orjson.loads(content)
+            files_data = data["files"] if isinstance(data, dict) else data
             
-            return playbook_files
+            # Convert to PlaybookFile objects in a single validation pass
+            return _PLAYBOOK_FILES_ADAPTER.validate_python(files_data)
             
-        except (json.JSONDecodeError, ValidationError, KeyError) as e:
-            logger.error(f"Error parsing OpenAI response: {str(e)}")
-            logger.debug(f"Raw response content: {content}")
+        except (orjson.JSONDecodeError, ValidationError, KeyError, TypeError) as e:
+            logger.error("Error parsing OpenAI response: %s", e)
+            logger.debug("Raw response content: %s", content)
             raise ValueError(f"Failed to parse OpenAI response: {str(e)}")
@@ -0,0 +1,83 @@
+"""
+Prompts shared by the LLM providers.
+
+The prompt text is built once at import time instead of on every request.
+Everything before the task description is byte-for-byte identical across
+calls, so the providers can reuse their prompt prefix caches.
+"""
+
+import hashlib
+from typing import Optional
+
+SYSTEM_PROMPT = """You are an expert Ansible playbook generator. Your task is to create complete, valid Ansible playbooks based on natural language descriptions.
+
+Follow these guidelines:
+1. Create all necessary files for a complete Ansible playbook, including main playbook YAML, roles, tasks, handlers, templates, etc.
+2. Use best practices for Ansible playbook structure and organization.
+3. Include comments to explain complex tasks or configurations.
+4. Ensure the playbook is idempotent and follows Ansible lint rules.
+5. Return your response in a structured JSON format with each file as a separate object.
+
+Your response must be a valid JSON array where each object has the following properties:
+- filename: The name of the file
+- content: The complete content of the file
+- path: The relative path within the playbook structure
+
+Return the array as the value of a "files" key in a JSON object.
+
+Example response format:
+{
+    "files": [
+        {
+            "filename": "site.yml",
+            "content": "---\\n# Main playbook\\n- name: Example playbook\\n  hosts: all\\n  roles:\\n    - example_role",
+            "path": "."
+        },
+        {
+            "filename": "tasks.yml",
+            "content": "---\\n- name: Install package\\n  apt:\\n    name: nginx\\n    state: present",
+            "path": "roles/example_role/tasks"
+        }
+    ]
+}"""
+
+# The system prompt is the same on every request, so encode and hash it once
+SYSTEM_PROMPT_BYTES = SYSTEM_PROMPT.encode("utf-8")
+SYSTEM_PROMPT_SHA256 = hashlib.sha256(SYSTEM_PROMPT_BYTES).digest()
+
+# Opening of every user prompt, followed by the task description
+PROMPT_HEADER = "Generate a complete Ansible playbook for the following task:\n\n"
+
+# Instructions that close every user prompt
+PROMPT_SUFFIX = """Please provide all necessary files for a complete Ansible playbook, including:
+1. Main playbook YAML file
+2. Any roles, tasks, handlers, templates, variables, etc.
+3. README.md with usage instructions
+
+Ensure the playbook follows Ansible best practices and is properly structured."""
+
+# Response format reminder for models that lose track of the system prompt
+JSON_FORMAT_REMINDER = """
+
+Your response must be a valid JSON array where each object has the following properties:
+- filename: The name of the file
+- content: The complete content of the file
+- path: The relative path within the playbook structure
+
+Return the array as the value of a "files" key in a JSON object."""
+
+
+def construct_prompt(description: str, additional_context: Optional[str] = None, suffix: str = PROMPT_SUFFIX) -> str:
+    """
+    Construct the user prompt for a playbook request.
+    
+    Args:
+        description: Natural language description of the Ansible task
+        additional_context: Additional context or requirements for the playbook
+        suffix: Instructions appended after the request
+    
+    Returns:
+        Formatted prompt string
+    """
+    context = f"Additional context:\n{additional_context}\n\n" if additional_context else ""
+    return f"{PROMPT_HEADER}{description}\n\n{context}{suffix}"
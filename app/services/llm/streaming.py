@@ -0,0 +1,82 @@
+"""
+Incremental parsing of streamed LLM replies.
+"""
+
+from typing import List, Optional
+
+import ijson
+from pydantic import ValidationError
+
+from app.models.schemas import PlaybookFile
+
+
+class PlaybookStreamParser:
+    """
+    Parses a streamed JSON reply into PlaybookFile objects as it arrives.
+    
+    Each file is decoded as soon as its closing brace is received, so
+    parsing overlaps with generation and a malformed reply is rejected
+    without waiting for the rest of it. Replies may be a bare JSON array of
+    files or an object with the array under a "files" key; a reply without
+    any files is rejected.
+    """
+    
+    def __init__(self, provider_name: str):
+        """
+        Initialize the parser.
+        
+        Args:
+            provider_name: Name of the LLM provider, used in error messages
+        """
+        self.provider_name = provider_name
+        self.files: List[PlaybookFile] = []
+        self._wrapped_items = ijson.sendable_list()
+        self._bare_items = ijson.sendable_list()
+        self._parsers = [
+            ijson.items_coro(self._wrapped_items, "files.item", use_float=True),
+            ijson.items_coro(self._bare_items, "item", use_float=True),
+        ]
+    
+    def feed(self, text: str) -> None:
+        """
+        Feed the next chunk of the reply.
+        
+        Args:
+            text: Chunk of the reply content
+        
+        Raises:
+            ValueError: If the reply is not a valid list of playbook files
+        """
+        if text:
+            self._send(text.encode("utf-8"))
+    
+    def close(self) -> List[PlaybookFile]:
+        """
+        Finish parsing the reply.
+        
+        Returns:
+            List of PlaybookFile objects parsed from the reply
+        
+        Raises:
+            ValueError: If the reply is incomplete, not a valid list of playbook
+                files or contains no files
+        """
+        self._send(None)
+        if not self.files:
+            raise ValueError(f"Failed to parse {self.provider_name} response: no playbook files found")
+        return self.files
+    
+    def _send(self, data: Optional[bytes]) -> None:
+        """Send data to the parsers, or close them when data is None."""
+        try:
+            for parser in self._parsers:
+                if data is None:
+                    parser.close()
+                else:
+                    parser.send(data)
+            
+            for items in (self._wrapped_items, self._bare_items):
+                self.files.extend(PlaybookFile.model_validate(item) for item in items)
+                del items[:]
+        except (ijson.JSONError, ValidationError) as e:
+            raise ValueError(f"Failed to parse {self.provider_name} response: {str(e)}")
@@ -15,14 +15,16 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     reload = os.getenv("DEBUG", "True").lower() in ("true", "1", "t")
+    workers = 1 if reload else int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
     
-    # Run the application
+    # Run the application, on uvloop and httptools where they are installed
     uvicorn.run(
         "app.main:app",
         host=host,
         port=port,
         reload=reload,
+        workers=workers,
+        loop="auto",
+        http="auto",
         log_level="debug" if reload else "info",
     )
-    
-    print(f"Ansible Playbook Generator running at http://{host}:{port}")
@@ -3,6 +3,7 @@
 Run tests for the Ansible Playbook Generator application.
 """
 
+import importlib.util
 import os
 import sys
 import pytest
@@ -15,8 +16,11 @@ if __name__ == "__main__":
     # Set test environment variables
     os.environ["APP_ENV"] = "test"
     
-    # Get command line arguments
+    # Get command line arguments, running the tests in parallel when pytest-xdist is installed
     args = sys.argv[1:] or ["tests/"]
+    if not sys.argv[1:] and importlib.util.find_spec("xdist") is not None:
+        # Keep each test module on one worker so module-level fixtures stay isolated
+        args += ["-n", "auto", "--dist=loadfile"]
     
     # Run the tests
     sys.exit(pytest.main(args))
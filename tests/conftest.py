@@ -0,0 +1,93 @@
+import json
+
+import httpx
+import pytest
+
+
+# Contents of the example playbook files shared by the tests
+SITE_YML_CONTENT = "---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role"
+TASKS_YML_CONTENT = "---\n- name: Install package\n  apt:\n    name: nginx\n    state: present"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run async tests and fixtures on asyncio for the whole session."""
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def session_event_loop(anyio_backend):
+    """Keep the anyio test runner open, so all async tests share one event loop."""
+    yield
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Import the application only when a test needs it, keeping collection fast."""
+    from app.main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """Create one test client for the session, running the app lifespan once."""
+    from fastapi.testclient import TestClient
+    from app.config import settings
+    
+    # The routes under test mock out Ansible, so skip warming up ansible-lint
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "ANSIBLE_LINT_WORKER", False)
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+@pytest.fixture(scope="session")
+async def async_client(app, session_event_loop):
+    """Create one async client for the session that calls the app in-process."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def example_playbook_dicts():
+    """Playbook files in the form the LLM returns them."""
+    return [
+        {
+            "filename": "site.yml",
+            "content": SITE_YML_CONTENT,
+            "path": "."
+        },
+        {
+            "filename": "tasks.yml",
+            "content": TASKS_YML_CONTENT,
+            "path": "roles/example_role/tasks"
+        }
+    ]
+
+
+@pytest.fixture(scope="session")
+def example_playbook_files(example_playbook_dicts):
+    """Playbook files as validated PlaybookFile objects, built once for the session."""
+    from app.models.schemas import PlaybookFile
+    
+    return [PlaybookFile(**data) for data in example_playbook_dicts]
+
+
+@pytest.fixture(scope="session")
+def example_playbook_json(example_playbook_dicts):
+    """Playbook files serialized as a JSON array, encoded once for the session."""
+    return json.dumps(example_playbook_dicts)
+
+
+@pytest.fixture(scope="session")
+def example_playbook_reply(example_playbook_dicts):
+    """Playbook files as a JSON mode reply, with the array under a "files" key."""
+    return json.dumps({"files": example_playbook_dicts})
+
+
+@pytest.fixture(scope="session")
+def dummy_zip(tmp_path_factory):
+    """Write a stand-in playbook archive once for the session."""
+    path = tmp_path_factory.mktemp("download") / "archive.zip"
+    path.write_bytes(b"test content")
+    return str(path)
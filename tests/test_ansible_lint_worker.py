@@ -0,0 +1,91 @@
+import sys
+
+import pytest
+
+from app.services.ansible_lint_worker import AnsibleLintWorker
+
+
+# Stand-in worker that answers every request with the arguments it received
+FAKE_WORKER = """
+import json, sys
+for line in sys.stdin:
+    args = json.loads(line)["args"]
+    print(json.dumps({"returncode": 2, "stdout": " ".join(args), "stderr": "summary"}), flush=True)
+"""
+
+
+@pytest.fixture
+def lint_worker():
+    """Create an AnsibleLintWorker running the stand-in worker."""
+    worker = AnsibleLintWorker(command=[sys.executable, "-c", FAKE_WORKER])
+    assert worker.start() is True
+    yield worker
+    worker.stop()
+
+
+def test_run(lint_worker):
+    """Test running ansible-lint through the worker."""
+    result = lint_worker.run(["site.yml", "-p"])
+    
+    assert result.args == ["ansible-lint", "site.yml", "-p"]
+    assert result.returncode == 2
+    assert result.stdout == "site.yml -p"
+    assert result.stderr == "summary"
+    
+    # The worker keeps serving requests
+    assert lint_worker.run(["other.yml"]).stdout == "other.yml"
+
+
+def test_run_when_busy(lint_worker):
+    """Test that a busy worker defers to the caller instead of blocking."""
+    lint_worker._lock.acquire()
+    try:
+        assert lint_worker.run(["site.yml"]) is None
+    finally:
+        lint_worker._lock.release()
+
+
+def test_run_after_stop(lint_worker):
+    """Test that a stopped worker defers to the caller."""
+    lint_worker.stop()
+    assert lint_worker.is_running is False
+    assert lint_worker.run(["site.yml"]) is None
+
+
+def test_run_when_worker_exits():
+    """Test that a worker exiting mid-request is detected."""
+    worker = AnsibleLintWorker(command=[sys.executable, "-c", "import sys; sys.stdin.readline()"])
+    assert worker.start() is True
+    
+    assert worker.run(["site.yml"]) is None
+    assert worker.is_running is False
+    
+    # A worker that just failed is not restarted straight away
+    assert worker.run(["site.yml"]) is None
+    assert worker.is_running is False
+    worker.stop()
+
+
+def test_run_restarts_dead_worker(lint_worker):
+    """Test that a worker that died is restarted to serve the next request."""
+    process = lint_worker._process
+    process.kill()
+    process.wait()
+    
+    result = lint_worker.run(["site.yml"])
+    
+    assert result.stdout == "site.yml"
+    assert lint_worker._process is not process
+    assert lint_worker.is_running is True
+
+
+def test_run_when_worker_hangs():
+    """Test that a worker that never answers is stopped once the timeout runs out."""
+    worker = AnsibleLintWorker(
+        command=[sys.executable, "-c", "import sys, time; sys.stdin.readline(); time.sleep(60)"],
+        timeout=0.5,
+    )
+    assert worker.start() is True
+    
+    assert worker.run(["site.yml"]) is None
+    assert worker.is_running is False
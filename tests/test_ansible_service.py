@@ -1,50 +1,49 @@
+import io
 import os
 import pytest
-import tempfile
 import shutil
+import subprocess
+import zipfile
 from pathlib import Path
-from unittest.mock import patch, MagicMock, mock_open
+from types import SimpleNamespace
+from unittest.mock import MagicMock, mock_open
 
 from app.services.ansible_service import AnsibleService
 from app.models.schemas import PlaybookFile, ValidationResult
 
 
 @pytest.fixture
-def ansible_service():
+def ansible_service(fs):
     """Create an AnsibleService instance for testing."""
     service = AnsibleService()
-    # Override the output directory to use a temporary directory
-    with tempfile.TemporaryDirectory() as temp_dir:
-        service.output_dir = Path(temp_dir)
-        yield service
+    # Override the output directory to use a directory on the in-memory filesystem
+    fs.create_dir("/tmp/ansible_output")
+    service.output_dir = Path("/tmp/ansible_output")
+    yield service
+
+
+@pytest.fixture
+def mock_run(monkeypatch):
+    """Replace subprocess.run with a mock reporting a clean ansible-lint run."""
+    run = MagicMock(return_value=SimpleNamespace(returncode=0, stdout="", stderr=""))
+    monkeypatch.setattr(subprocess, "run", run)
+    return run
 
 
 def test_generate_playbook_id(ansible_service):
     """Test generating a unique playbook ID."""
     playbook_id = ansible_service.generate_playbook_id()
     assert isinstance(playbook_id, str)
-    assert len(playbook_id) > 0
+    assert len(playbook_id) == 32
+    assert all(c in "0123456789abcdef" for c in playbook_id)
+    assert playbook_id != ansible_service.generate_playbook_id()
 
 
-def test_save_playbook(ansible_service):
+def test_save_playbook(ansible_service, example_playbook_files):
     """Test saving a playbook to the output directory."""
-    # Create test playbook files
-    playbook_files = [
-        PlaybookFile(
-            filename="site.yml",
-            content="---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role",
-            path="."
-        ),
-        PlaybookFile(
-            filename="tasks.yml",
-            content="---\n- name: Install package\n  apt:\n    name: nginx\n    state: present",
-            path="roles/example_role/tasks"
-        )
-    ]
-    
     # Save the playbook
     playbook_id = "test-playbook-id"
-    playbook_dir = ansible_service.save_playbook(playbook_id, playbook_files)
+    playbook_dir = ansible_service.save_playbook(playbook_id, example_playbook_files)
     
     # Check that the playbook directory was created
     assert playbook_dir.exists()
@@ -54,7 +53,7 @@ def test_save_playbook(ansible_service):
     site_yml_path = playbook_dir / "site.yml"
     assert site_yml_path.exists()
     assert site_yml_path.is_file()
-    assert site_yml_path.read_text() == playbook_files[0].content
+    assert site_yml_path.read_text() == example_playbook_files[0].content
     
     tasks_dir = playbook_dir / "roles/example_role/tasks"
     assert tasks_dir.exists()
@@ -63,30 +62,21 @@ def test_save_playbook(ansible_service):
     tasks_yml_path = tasks_dir / "tasks.yml"
     assert tasks_yml_path.exists()
     assert tasks_yml_path.is_file()
-    assert tasks_yml_path.read_text() == playbook_files[1].content
+    assert tasks_yml_path.read_text() == example_playbook_files[1].content
 
 
-@patch("subprocess.run")
-def test_validate_playbook_success(mock_run, ansible_service):
+def test_validate_playbook_success(mock_run, ansible_service, example_playbook_files):
     """Test validating a playbook with successful validation."""
     # Mock the subprocess.run function
-    mock_process = MagicMock()
-    mock_process.returncode = 0
-    mock_process.stdout = "Playbook validation successful."
-    mock_process.stderr = ""
-    mock_run.return_value = mock_process
+    mock_run.return_value = SimpleNamespace(returncode=0, stdout="Playbook validation successful.", stderr="")
     
-    # Create test playbook files
-    playbook_files = [
-        PlaybookFile(
-            filename="site.yml",
-            content="---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role",
-            path="."
-        )
-    ]
+    # Use the main playbook of the example files
+    playbook_files = example_playbook_files[:1]
     
-    # Validate the playbook
-    validation_result = ansible_service.validate_playbook(playbook_files)
+    # Save and validate the playbook
+    playbook_id = ansible_service.generate_playbook_id()
+    ansible_service.save_playbook(playbook_id, playbook_files)
+    validation_result = ansible_service.validate_saved_playbook(playbook_id, playbook_files)
     
     # Check the validation result
     assert validation_result.is_valid is True
@@ -102,15 +92,10 @@ def test_validate_playbook_success(mock_run, ansible_service):
     assert kwargs["check"] is False
 
 
-@patch("subprocess.run")
 def test_validate_playbook_failure(mock_run, ansible_service):
     """Test validating a playbook with validation errors."""
     # Mock the subprocess.run function
-    mock_process = MagicMock()
-    mock_process.returncode = 1
-    mock_process.stdout = "Error: Syntax error in playbook"
-    mock_process.stderr = ""
-    mock_run.return_value = mock_process
+    mock_run.return_value = SimpleNamespace(returncode=1, stdout="Error: Syntax error in playbook", stderr="")
     
     # Create test playbook files
     playbook_files = [
@@ -121,8 +106,10 @@ def test_validate_playbook_failure(mock_run, ansible_service):
         )
     ]
     
-    # Validate the playbook
-    validation_result = ansible_service.validate_playbook(playbook_files)
+    # Save and validate the playbook
+    playbook_id = ansible_service.generate_playbook_id()
+    ansible_service.save_playbook(playbook_id, playbook_files)
+    validation_result = ansible_service.validate_saved_playbook(playbook_id, playbook_files)
     
     # Check the validation result
     assert validation_result.is_valid is False
@@ -130,10 +117,87 @@ def test_validate_playbook_failure(mock_run, ansible_service):
     assert validation_result.messages[0] == "Error: Syntax error in playbook"
 
 
+def test_validate_playbook_with_worker(mock_run, ansible_service, example_playbook_files):
+    """Test that the lint worker gets the same arguments as the subprocess fallback."""
+    worker = MagicMock()
+    worker.run.return_value = subprocess.CompletedProcess([], 0, stdout="", stderr="")
+    ansible_service.lint_worker = worker
+    
+    playbook_id = ansible_service.generate_playbook_id()
+    ansible_service.save_playbook(playbook_id, example_playbook_files[:1])
+    validation_result = ansible_service.validate_saved_playbook(playbook_id, example_playbook_files[:1])
+    
+    assert validation_result.is_valid is True
+    mock_run.assert_not_called()
+    args = worker.run.call_args.args[0]
+    assert args[0] == "--nocolor"
+    assert Path(args[1]).name == "site.yml"
+
+
+def test_validate_saved_playbook(mock_run, ansible_service, example_playbook_files):
+    """Test that validate_saved_playbook lints the saved copy of the playbook."""
+    # Use the main playbook of the example files
+    playbook_files = example_playbook_files[:1]
+    
+    # Save and validate the playbook
+    playbook_id = ansible_service.generate_playbook_id()
+    ansible_service.save_playbook(playbook_id, playbook_files)
+    validation_result = ansible_service.validate_saved_playbook(playbook_id, playbook_files)
+    
+    # Check the validation result and the saved file
+    assert validation_result.is_valid is True
+    site_yml_path = ansible_service.output_dir / playbook_id / "site.yml"
+    assert site_yml_path.read_text() == playbook_files[0].content
+    
+    # Verify ansible-lint ran against the saved file
+    args, kwargs = mock_run.call_args
+    assert args[0][:2] == ["ansible-lint", "--nocolor"]
+    assert args[0][2] == str(site_yml_path)
+
+
+def test_validate_uploaded_playbook(mock_run, ansible_service):
+    """Test validating uploaded files, including files in subdirectories."""
+    # Create test uploads
+    uploads = [
+        ("roles/example_role/tasks/main.yml", io.BytesIO(b"---\n- name: Install package\n  apt:\n    name: nginx")),
+        ("site.yml", io.BytesIO(b"---\n- name: Example playbook\n  hosts: all")),
+    ]
+    
+    # Validate the uploads
+    validation_result = ansible_service.validate_uploaded_playbook(uploads)
+    
+    # Check the validation result
+    assert validation_result.is_valid is True
+    
+    # Verify ansible-lint ran against the top-level playbook
+    args, kwargs = mock_run.call_args
+    assert Path(args[0][2]).name == "site.yml"
+    assert Path(args[0][2]).parent.name != "tasks"
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["../../../tmp/evil_upload.yml", "/tmp/evil_upload.yml", "roles/../../evil_upload.yml", "..", "", None],
+)
+def test_validate_uploaded_playbook_rejects_unsafe_filenames(mock_run, ansible_service, filename):
+    """Test that uploads with a missing, absolute or escaping name are not written."""
+    uploads = [
+        ("site.yml", io.BytesIO(b"---\n- name: Example playbook\n  hosts: all")),
+        (filename, io.BytesIO(b"---\n- name: Evil\n  hosts: all")),
+    ]
+    
+    validation_result = ansible_service.validate_uploaded_playbook(uploads)
+    
+    assert validation_result.is_valid is False
+    assert "Invalid upload filename" in validation_result.messages[0]
+    assert not Path("/tmp/evil_upload.yml").exists()
+    mock_run.assert_not_called()
+
+
 def test_create_playbook_archive(ansible_service):
     """Test creating a ZIP archive of a playbook."""
     # Create a test playbook directory
-    playbook_id = "test-archive-id"
+    playbook_id = "0123456789abcdef0123456789abcdef"
     playbook_dir = ansible_service.output_dir / playbook_id
     playbook_dir.mkdir(parents=True)
     
@@ -148,12 +212,17 @@ def test_create_playbook_archive(ansible_service):
     assert archive_path.exists()
     assert archive_path.is_file()
     assert archive_path.suffix == ".zip"
+    
+    # Check the archive contents
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.namelist() == ["test.yml"]
+        assert archive.read("test.yml") == b"Test content"
 
 
 def test_get_playbook_path_exists(ansible_service):
     """Test getting the path to an existing playbook."""
     # Create a test playbook directory
-    playbook_id = "test-path-id"
+    playbook_id = "fedcba9876543210fedcba9876543210"
     playbook_dir = ansible_service.output_dir / playbook_id
     playbook_dir.mkdir(parents=True)
     
@@ -171,3 +240,13 @@ def test_get_playbook_path_not_exists(ansible_service):
     
     # Check that the path is None
     assert path is None
+
+
+@pytest.mark.parametrize("playbook_id", ["..", ".", "tmp", "0123456789ABCDEF0123456789ABCDEF"])
+def test_invalid_playbook_ids_are_not_found(ansible_service, playbook_id):
+    """Test that IDs other than 32 lowercase hex characters never resolve to a directory."""
+    (ansible_service.output_dir / playbook_id).mkdir(parents=True, exist_ok=True)
+    
+    assert ansible_service.get_playbook_path(playbook_id) is None
+    assert ansible_service.create_playbook_archive(playbook_id) is None
+    assert not list(ansible_service.output_dir.glob("*.zip*"))
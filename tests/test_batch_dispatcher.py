@@ -0,0 +1,84 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+
+import httpx
+
+from app.services.llm.batch_dispatcher import BatchDispatcher
+
+
+class FakeBatchAPI:
+    """In-memory stand-in for the OpenAI Files and Batches endpoints."""
+    
+    def __init__(self, status="completed"):
+        self.status = status
+        self.batches = []
+        self.input_lines = []
+    
+    def __call__(self, request):
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/files":
+            self.input_lines = [
+                json.loads(line) for line in request.content.splitlines() if line.startswith(b'{"custom_id"')
+            ]
+            return httpx.Response(200, json={"id": "file-input"})
+        if request.method == "POST" and path == "/v1/batches":
+            self.batches.append(json.loads(request.content))
+            return httpx.Response(200, json={"id": "batch-1", "status": "in_progress"})
+        if path == "/v1/batches/batch-1":
+            return httpx.Response(200, json={"id": "batch-1", "status": self.status, "output_file_id": "file-output"})
+        if path == "/v1/files/file-output/content":
+            output = "\n".join(
+                json.dumps({
+                    "custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "body": {"echo": line["body"]["messages"]}},
+                })
+                for line in self.input_lines
+            )
+            return httpx.Response(200, content=output.encode())
+        return httpx.Response(404)
+
+
+async def run_with_dispatcher(api, coroutine_factory, **kwargs):
+    """Run a coroutine against a started dispatcher backed by api."""
+    client = httpx.AsyncClient(base_url="https://api.openai.test/v1", transport=httpx.MockTransport(api))
+    
+    with patch("app.services.llm.batch_dispatcher.get_openai_http_client", return_value=client):
+        dispatcher = BatchDispatcher(poll_interval=0, **kwargs)
+        dispatcher.start()
+        try:
+            return await coroutine_factory(dispatcher)
+        finally:
+            await dispatcher.stop()
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_share_one_batch():
+    """Test that requests submitted together are sent as a single batch job."""
+    api = FakeBatchAPI()
+    
+    async def submit_two(dispatcher):
+        return await asyncio.gather(
+            dispatcher.submit({"messages": ["first"]}),
+            dispatcher.submit({"messages": ["second"]}),
+        )
+    
+    results = await run_with_dispatcher(api, submit_two, batch_min_size=2, batch_window=5)
+    
+    assert results == [{"echo": ["first"]}, {"echo": ["second"]}]
+    assert len(api.batches) == 1
+    assert api.batches[0]["endpoint"] == "/v1/chat/completions"
+    assert [line["custom_id"] for line in api.input_lines] == ["0", "1"]
+
+
+@pytest.mark.anyio
+async def test_failed_batch_raises_value_error():
+    """Test that a batch that does not complete fails its requests."""
+    api = FakeBatchAPI(status="failed")
+    
+    async def submit_one(dispatcher):
+        return await dispatcher.submit({"messages": ["only"]})
+    
+    with pytest.raises(ValueError, match="status failed"):
+        await run_with_dispatcher(api, submit_one, batch_min_size=10, batch_window=0)
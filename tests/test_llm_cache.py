@@ -0,0 +1,80 @@
+import hashlib
+import os
+import time
+
+from app.services.llm.cache import LLMCache
+from app.models.schemas import PlaybookFile
+
+
+def make_files(name):
+    """Create a single-file playbook for testing."""
+    return [PlaybookFile(filename=name, content="---\n- hosts: all", path=".")]
+
+
+def test_cache_key_is_stable():
+    """Test that identical prompts produce the same cache key."""
+    expert = hashlib.sha256(b"You are an expert").digest()
+    novice = hashlib.sha256(b"You are a novice").digest()
+    
+    key = LLMCache.cache_key("OpenAI", "gpt-4-turbo", expert, "Install Nginx")
+    assert key == LLMCache.cache_key("OpenAI", "gpt-4-turbo", expert, "Install Nginx")
+    assert key != LLMCache.cache_key("OpenAI", "gpt-4-turbo", expert, "Install Apache")
+    assert key != LLMCache.cache_key("OpenAI", "gpt-4-turbo", novice, "Install Nginx")
+    assert key != LLMCache.cache_key("Ollama", "gpt-4-turbo", expert, "Install Nginx")
+
+
+def test_get_and_set():
+    """Test cache hits and misses."""
+    cache = LLMCache(max_size=2)
+    files = make_files("site.yml")
+    
+    assert cache.get("key") is None
+    cache.set("key", files)
+    assert cache.get("key") == files
+    
+    assert cache.stats() == {"size": 1, "max_size": 2, "hits": 1, "misses": 1}
+
+
+def test_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted when the cache is full."""
+    cache = LLMCache(max_size=2)
+    cache.set("first", make_files("first.yml"))
+    cache.set("second", make_files("second.yml"))
+    
+    # Touch the first entry so the second one becomes the oldest
+    cache.get("first")
+    cache.set("third", make_files("third.yml"))
+    
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_disabled_cache():
+    """Test that a cache with a size of 0 stores nothing."""
+    cache = LLMCache(max_size=0)
+    cache.set("key", make_files("site.yml"))
+    assert cache.get("key") is None
+
+
+def test_disk_cache_survives_new_instance(tmp_path):
+    """Test that entries written to disk are served by a new cache instance."""
+    files = make_files("site.yml")
+    LLMCache(max_size=2, cache_dir=tmp_path).set("key", files)
+    
+    cache = LLMCache(max_size=2, cache_dir=tmp_path)
+    assert cache.get("key") == files
+    assert cache.stats()["hits"] == 1
+
+
+def test_disk_cache_expires_entries(tmp_path):
+    """Test that entries older than the TTL are discarded."""
+    LLMCache(max_size=2, cache_dir=tmp_path, ttl=60).set("key", make_files("site.yml"))
+    
+    # Age the entry on disk past the TTL
+    stale = time.time() - 120
+    os.utime(tmp_path / "key.json", (stale, stale))
+    
+    cache = LLMCache(max_size=2, cache_dir=tmp_path, ttl=60)
+    assert cache.get("key") is None
+    assert not (tmp_path / "key.json").exists()
@@ -0,0 +1,63 @@
+import httpx
+import pytest
+
+from app.services.llm.clients import MAX_RETRY_DELAY, RetryTransport
+
+
+def make_client(responses, **kwargs):
+    """Create a client whose requests are answered from a list of responses."""
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        return responses[len(calls) - 1]
+    
+    transport = RetryTransport(httpx.MockTransport(handler), backoff=0, **kwargs)
+    return httpx.AsyncClient(base_url="https://api.test", transport=transport), calls
+
+
+@pytest.mark.anyio
+async def test_retries_transient_errors():
+    """Test that transient server errors are retried until a response succeeds."""
+    client, calls = make_client([
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"ok": True}),
+    ])
+    
+    response = await client.post("/chat/completions", content=b"{}")
+    
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert all(call.content == b"{}" for call in calls)
+
+
+@pytest.mark.anyio
+async def test_gives_up_after_max_retries():
+    """Test that the last response is returned once the retries run out."""
+    client, calls = make_client([httpx.Response(503)] * 3, max_retries=2)
+    
+    response = await client.get("/models")
+    
+    assert response.status_code == 503
+    assert len(calls) == 3
+
+
+@pytest.mark.anyio
+async def test_does_not_retry_client_errors():
+    """Test that non-retryable responses are returned immediately."""
+    client, calls = make_client([httpx.Response(401)])
+    
+    response = await client.get("/models")
+    
+    assert response.status_code == 401
+    assert len(calls) == 1
+
+
+def test_retry_delay_honours_retry_after():
+    """Test that Retry-After takes precedence over the backoff and is capped."""
+    transport = RetryTransport(httpx.MockTransport(lambda request: httpx.Response(200)), backoff=1)
+    
+    assert transport._retry_delay(httpx.Response(429, headers={"Retry-After": "2"}), 0) == 2.0
+    assert transport._retry_delay(httpx.Response(429, headers={"Retry-After": "3600"}), 0) == MAX_RETRY_DELAY
+    assert 4.0 <= transport._retry_delay(httpx.Response(503), 2) < 4.1
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.models.schemas import PlaybookFile
+from app.services.llm.factory import LLMProviderFactory
+
+
+PLAYBOOK_FILES = [PlaybookFile(filename="site.yml", content="---\n- hosts: all", path=".")]
+
+
+class SlowProvider:
+    """Provider stub that takes a moment to generate, so requests overlap."""
+    
+    def __init__(self, error=None, files=PLAYBOOK_FILES, available=True):
+        self.calls = 0
+        self.error = error
+        self.files = files
+        self.available = available
+    
+    def get_provider_name(self):
+        return "Stub"
+    
+    def get_model_name(self):
+        return "stub-model"
+    
+    async def is_available(self):
+        return self.available
+    
+    def get_cache_key(self, description, additional_context=None):
+        return f"{description}|{additional_context}"
+    
+    async def generate_ansible_playbook(self, description, additional_context=None, allow_batch=False):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return list(self.files)
+
+
+def make_factory(provider):
+    """Create a factory that always uses provider, with the cache disabled."""
+    factory = LLMProviderFactory()
+    factory.cache.max_size = 0
+    factory._active_provider = (time.monotonic(), provider)
+    return factory
+
+
+@pytest.mark.anyio
+async def test_identical_requests_are_coalesced():
+    """Test that identical concurrent requests share one generation."""
+    provider = SlowProvider()
+    factory = make_factory(provider)
+    
+    results = await asyncio.gather(
+        *(factory.generate_ansible_playbook("Install Nginx on Ubuntu servers") for _ in range(5))
+    )
+    
+    assert provider.calls == 1
+    assert all(files == PLAYBOOK_FILES for files in results)
+    assert factory._inflight == {}
+
+
+@pytest.mark.anyio
+async def test_different_requests_are_not_coalesced():
+    """Test that requests with different prompts or batching are generated separately."""
+    provider = SlowProvider()
+    factory = make_factory(provider)
+    
+    await asyncio.gather(
+        factory.generate_ansible_playbook("Install Nginx on Ubuntu servers"),
+        factory.generate_ansible_playbook("Install Apache on Ubuntu servers"),
+        factory.generate_ansible_playbook("Install Nginx on Ubuntu servers", allow_batch=True),
+    )
+    
+    assert provider.calls == 3
+
+
+@pytest.mark.anyio
+async def test_coalesced_requests_share_errors():
+    """Test that a failed generation is reported to every waiting request and not kept."""
+    provider = SlowProvider(error=ValueError("OpenAI API error: 500"))
+    factory = make_factory(provider)
+    
+    results = await asyncio.gather(
+        *(factory.generate_ansible_playbook("Install Nginx on Ubuntu servers") for _ in range(3)),
+        return_exceptions=True,
+    )
+    
+    assert provider.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert factory._inflight == {}
+    
+    with pytest.raises(ValueError, match="OpenAI API error"):
+        await factory.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    assert provider.calls == 2
+
+
+@pytest.mark.anyio
+async def test_empty_results_are_not_cached():
+    """Test that an empty generation is not served from the cache to later requests."""
+    provider = SlowProvider(files=[])
+    factory = make_factory(provider)
+    factory.cache.max_size = 10
+    
+    assert await factory.generate_ansible_playbook("Install Nginx on Ubuntu servers") == []
+    assert await factory.generate_ansible_playbook("Install Nginx on Ubuntu servers") == []
+    assert provider.calls == 2
+
+
+@pytest.mark.anyio
+async def test_active_provider_expires():
+    """Test that the chosen provider is checked again once the availability TTL has passed."""
+    openai, ollama = SlowProvider(available=False), SlowProvider()
+    factory = LLMProviderFactory()
+    factory.preferred_provider = "openai"
+    factory._provider_instances = {"openai": openai, "ollama": ollama}
+    
+    assert await factory.get_provider() is ollama
+    
+    # The preferred provider comes back, but the choice is reused until it expires
+    openai.available = True
+    assert await factory.get_provider() is ollama
+    factory._active_provider = (time.monotonic() - 60, ollama)
+    assert await factory.get_provider() is openai
+
+
+@pytest.mark.anyio
+async def test_connection_failure_resets_provider():
+    """Test that a provider that cannot be reached is not kept for later requests."""
+    request = httpx.Request("POST", "https://api.openai.test/v1/chat/completions")
+    try:
+        raise httpx.ConnectError("Connection refused", request=request)
+    except httpx.ConnectError:
+        try:
+            raise ValueError("Failed to connect to OpenAI API: Connection refused")
+        except ValueError as e:
+            error = e
+    
+    factory = make_factory(SlowProvider(error=error))
+    
+    with pytest.raises(ValueError, match="Failed to connect"):
+        await factory.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    assert factory._active_provider is None
+
+
+@pytest.mark.anyio
+async def test_other_failures_keep_provider():
+    """Test that an error unrelated to reaching the provider keeps it active."""
+    factory = make_factory(SlowProvider(error=ValueError("Failed to parse OpenAI response")))
+    
+    with pytest.raises(ValueError, match="Failed to parse"):
+        await factory.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    assert factory._active_provider is not None
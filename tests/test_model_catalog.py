@@ -0,0 +1,48 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.llm.catalog import ModelCatalog
+
+
+@pytest.mark.anyio
+async def test_fresh_catalog_is_served_from_cache():
+    """Test that a fresh catalog does not fetch again."""
+    catalog = ModelCatalog()
+    fetch = AsyncMock(return_value=["llama3", "mistral"])
+    
+    first = await catalog.get_models("ollama", fetch)
+    second = await catalog.get_models("ollama", fetch)
+    
+    assert first == second == {"llama3", "mistral"}
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_stale_catalog_is_served_while_refreshing():
+    """Test that a stale catalog is returned immediately and refreshed in the background."""
+    catalog = ModelCatalog(max_age=60)
+    catalog._entries["ollama"] = (time.time() - 120, frozenset({"llama3"}))
+    fetch = AsyncMock(return_value=["llama3", "mistral"])
+    
+    stale = await catalog.get_models("ollama", fetch)
+    await asyncio.gather(*catalog._refreshing.values())
+    refreshed = await catalog.get_models("ollama", fetch)
+    
+    assert stale == {"llama3"}
+    assert refreshed == {"llama3", "mistral"}
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_catalog_persists_to_disk(tmp_path):
+    """Test that catalogs written to disk are loaded by a new instance."""
+    path = tmp_path / "providers.json"
+    await ModelCatalog(path).get_models("ollama", AsyncMock(return_value=["llama3"]))
+    
+    fetch = AsyncMock(return_value=[])
+    models = await ModelCatalog(path).get_models("ollama", fetch)
+    
+    assert models == {"llama3"}
+    fetch.assert_not_awaited()
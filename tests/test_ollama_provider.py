@@ -0,0 +1,132 @@
+import asyncio
+import json
+import pytest
+
+import httpx
+
+from app.services.llm import ollama_provider
+from app.services.llm.catalog import model_catalog
+from app.services.llm.ollama_provider import OllamaProvider
+
+
+def stream_lines(content, chunk_size=16):
+    """Encode content as the newline-delimited JSON of a streamed Ollama generation."""
+    lines = [
+        json.dumps({"response": content[i:i + chunk_size], "done": False})
+        for i in range(0, len(content), chunk_size)
+    ]
+    lines.append(json.dumps({"response": "", "done": True}))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def make_provider(handler):
+    """Create an OllamaProvider whose HTTP client is served by handler."""
+    return OllamaProvider(
+        client=httpx.AsyncClient(
+            base_url="http://ollama.test:11434",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_streams_generation(example_playbook_reply, example_playbook_files):
+    """Test that generation streams the reply and parses the files from it."""
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=stream_lines(example_playbook_reply))
+    
+    provider = make_provider(handler)
+    files = await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    
+    assert files == example_playbook_files
+    assert len(requests) == 1
+    assert requests[0].url.path == "/api/generate"
+    assert requests[0].headers["Content-Type"] == "application/json"
+    
+    payload = json.loads(requests[0].content)
+    assert payload["model"] == provider.model
+    assert payload["stream"] is True
+    assert payload["format"] == "json"
+    assert "Install Nginx on Ubuntu servers" in payload["prompt"]
+    assert payload["system"]
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_limits_concurrency(monkeypatch, example_playbook_reply, example_playbook_files):
+    """Test that concurrent generations wait for a free request slot."""
+    monkeypatch.setattr(ollama_provider, "_request_slots", asyncio.Semaphore(1))
+    in_flight = []
+    peak = 0
+    
+    async def handler(request):
+        nonlocal peak
+        in_flight.append(request)
+        peak = max(peak, len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(request)
+        return httpx.Response(200, content=stream_lines(example_playbook_reply))
+    
+    provider = make_provider(handler)
+    results = await asyncio.gather(*(
+        provider.generate_ansible_playbook("Install Nginx on Ubuntu servers") for _ in range(3)
+    ))
+    
+    assert all(files == example_playbook_files for files in results)
+    assert peak == 1
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_http_error(monkeypatch):
+    """Test that API errors are reported as ValueError and free the request slot."""
+    monkeypatch.setattr(ollama_provider, "_request_slots", asyncio.Semaphore(1))
+    provider = make_provider(lambda request: httpx.Response(404, text="model 'llama3' not found"))
+    
+    with pytest.raises(ValueError, match="Ollama API error: 404 - model 'llama3' not found"):
+        await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    assert not ollama_provider._request_slots.locked()
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_connection_error():
+    """Test that connection failures are reported as ValueError."""
+    def handler(request):
+        raise httpx.ConnectError("Connection refused", request=request)
+    
+    provider = make_provider(handler)
+    
+    with pytest.raises(ValueError, match="Failed to connect to Ollama API"):
+        await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_malformed_stream():
+    """Test that a malformed streamed reply is reported as ValueError."""
+    provider = make_provider(lambda request: httpx.Response(200, content=stream_lines('{"files": [{"filename": ')))
+    
+    with pytest.raises(ValueError, match="Failed to parse Ollama response"):
+        await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+
+
+@pytest.mark.anyio
+async def test_is_available(monkeypatch):
+    """Test that availability depends on the configured model being installed."""
+    model_catalog.clear()
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"models": [{"name": "llama3:latest"}, {"name": "mistral"}]})
+    
+    provider = make_provider(handler)
+    monkeypatch.setattr(provider, "model", "mistral")
+    assert await provider.is_available() is True
+    
+    monkeypatch.setattr(provider, "model", "codellama")
+    assert await provider.is_available() is False
+    
+    # The model list is fetched once and then served from the catalog
+    assert [request.url.path for request in requests] == ["/api/tags"]
+    model_catalog.clear()
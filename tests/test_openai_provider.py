@@ -0,0 +1,128 @@
+import json
+import pytest
+
+import httpx
+
+from app.config import settings
+from app.services.llm.clients import close_http_clients
+from app.services.llm.openai_provider import OpenAIProvider
+
+
+def stream_events(content, chunk_size=16):
+    """Encode content as the server-sent events of a streamed chat completion."""
+    events = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": content[i:i + chunk_size]}}]})
+        for i in range(0, len(content), chunk_size)
+    ]
+    events.append("data: [DONE]")
+    return ("\n\n".join(events) + "\n\n").encode()
+
+
+def make_provider(handler):
+    """Create an OpenAIProvider whose HTTP client is served by handler."""
+    return OpenAIProvider(
+        client=httpx.AsyncClient(
+            base_url="https://api.openai.test/v1",
+            transport=httpx.MockTransport(handler),
+        )
+    )
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_streams_chat_completion(example_playbook_reply, example_playbook_files):
+    """Test that generation streams the chat completion and parses the reply."""
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=stream_events(example_playbook_reply))
+    
+    provider = make_provider(handler)
+    files = await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    
+    assert files == example_playbook_files
+    assert len(requests) == 1
+    assert requests[0].url.path == "/v1/chat/completions"
+    assert requests[0].headers["Authorization"].startswith("Bearer ")
+    assert requests[0].headers["Content-Type"] == "application/json"
+    
+    payload = json.loads(requests[0].content)
+    assert payload["model"] == provider.model
+    assert [message["role"] for message in payload["messages"]] == ["system", "user"]
+    assert payload["response_format"] == {"type": "json_object"}
+    assert payload["stream"] is True
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_structured_outputs(monkeypatch, example_playbook_reply, example_playbook_files):
+    """Test that structured outputs request the strict playbook file schema."""
+    monkeypatch.setattr(settings, "OPENAI_STRUCTURED_OUTPUTS", True)
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=stream_events(example_playbook_reply))
+    
+    provider = make_provider(handler)
+    files = await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+    
+    assert files == example_playbook_files
+    response_format = json.loads(requests[0].content)["response_format"]
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["strict"] is True
+    
+    schema = response_format["json_schema"]["schema"]
+    assert schema["required"] == ["files"]
+    assert schema["additionalProperties"] is False
+    file_schema = schema["properties"]["files"]["items"]
+    assert sorted(file_schema["required"]) == ["content", "filename", "path"]
+    assert file_schema["additionalProperties"] is False
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_http_error():
+    """Test that API errors are reported as ValueError."""
+    provider = make_provider(lambda request: httpx.Response(429, text="Rate limit reached"))
+    
+    with pytest.raises(ValueError, match="OpenAI API error: 429"):
+        await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+
+
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_malformed_stream():
+    """Test that a malformed streamed reply is reported as ValueError."""
+    provider = make_provider(lambda request: httpx.Response(200, content=stream_events('{"files": [{"filename": ')))
+    
+    with pytest.raises(ValueError, match="Failed to parse OpenAI response"):
+        await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param("{}", id="empty_object"),
+        pytest.param("[]", id="empty_array"),
+        pytest.param('{"playbook": [{"filename": "site.yml", "content": "---", "path": "."}]}', id="other_key"),
+        pytest.param('{"filename": "site.yml", "content": "---", "path": "."}', id="bare_file"),
+    ],
+)
+@pytest.mark.anyio
+async def test_generate_ansible_playbook_without_files(content):
+    """Test that a reply without a files array is rejected rather than returned empty."""
+    provider = make_provider(lambda request: httpx.Response(200, content=stream_events(content)))
+    
+    with pytest.raises(ValueError, match="no playbook files found"):
+        await provider.generate_ansible_playbook("Install Nginx on Ubuntu servers")
+
+
+@pytest.mark.anyio
+async def test_shared_client_is_replaced_after_close():
+    """Test that a provider without an injected client survives the shared client being closed."""
+    provider = OpenAIProvider()
+    client = provider.client
+    
+    await close_http_clients()
+    
+    assert provider.client is not client
+    assert not provider.client.is_closed
+    await close_http_clients()
@@ -1,26 +1,21 @@
-import json
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock
 
+import httpx
+
+from app.services.llm.openai_provider import OpenAIProvider
 from app.services.openai_service import OpenAIService
-from app.models.schemas import PlaybookFile
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def openai_service():
-    """Create an OpenAIService instance for testing."""
-    with patch("app.services.openai_service.OpenAI") as mock_openai:
-        # Mock the OpenAI client
-        mock_client = MagicMock()
-        mock_openai.return_value = mock_client
-        
-        # Create the service
-        service = OpenAIService()
-        
-        # Set the mocked client
-        service.client = mock_client
-        
-        yield service
+    """Create an OpenAIService instance shared by the tests in this module."""
+    # Create the service on a client that never reaches the network
+    client = httpx.AsyncClient(
+        base_url="https://api.openai.test/v1",
+        transport=httpx.MockTransport(lambda request: httpx.Response(500)),
+    )
+    yield OpenAIService(client=client)
 
 
 def test_get_system_prompt(openai_service):
@@ -51,119 +46,53 @@ def test_construct_prompt(openai_service):
     assert "Additional context" in prompt
 
 
-@patch("app.services.openai_service.OpenAIService._parse_response")
-def test_generate_ansible_playbook(mock_parse_response, openai_service):
+def test_openai_service_is_openai_provider():
+    """Test that OpenAIService is the OpenAI provider under its former name."""
+    assert OpenAIService is OpenAIProvider
+
+
+@patch("app.services.openai_service.OpenAIService._stream_chat_completion", new_callable=AsyncMock)
+@pytest.mark.anyio
+async def test_generate_ansible_playbook(mock_stream_chat_completion, openai_service, example_playbook_files):
     """Test generating an Ansible playbook."""
-    # Mock the OpenAI API response
-    mock_message = MagicMock()
-    mock_message.content = "Mock response content"
-    
-    mock_choice = MagicMock()
-    mock_choice.message = mock_message
-    
-    mock_response = MagicMock()
-    mock_response.choices = [mock_choice]
-    
-    openai_service.client.chat.completions.create.return_value = mock_response
-    
-    # Mock the parse_response method
-    expected_files = [
-        PlaybookFile(
-            filename="site.yml",
-            content="---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role",
-            path="."
-        ),
-        PlaybookFile(
-            filename="tasks.yml",
-            content="---\n- name: Install package\n  apt:\n    name: nginx\n    state: present",
-            path="roles/example_role/tasks"
-        )
-    ]
-    mock_parse_response.return_value = expected_files
+    # Mock the streamed chat completion
+    mock_stream_chat_completion.return_value = example_playbook_files
     
     # Generate the playbook
     description = "Install Nginx on Ubuntu servers"
     additional_context = "Target systems are Ubuntu 22.04"
-    files = openai_service.generate_ansible_playbook(description, additional_context)
+    files = await openai_service.generate_ansible_playbook(description, additional_context)
     
     # Check the result
-    assert files == expected_files
-    
-    # Verify the mocks were called correctly
-    openai_service.client.chat.completions.create.assert_called_once()
-    args, kwargs = openai_service.client.chat.completions.create.call_args
-    
-    assert kwargs["model"] == openai_service.model
-    assert len(kwargs["messages"]) == 2
-    assert kwargs["messages"][0]["role"] == "system"
-    assert kwargs["messages"][1]["role"] == "user"
-    
-    mock_parse_response.assert_called_once_with("Mock response content")
+    assert files == example_playbook_files
+    
+    # Verify the request payload
+    mock_stream_chat_completion.assert_awaited_once()
+    payload = mock_stream_chat_completion.call_args.args[0]
+    
+    assert payload["model"] == openai_service.model
+    assert len(payload["messages"]) == 2
+    assert payload["messages"][0]["role"] == "system"
+    assert payload["messages"][1]["role"] == "user"
+    assert description in payload["messages"][1]["content"]
+    assert additional_context in payload["messages"][1]["content"]
+    assert payload["response_format"] == {"type": "json_object"}
 
 
-def test_parse_response_json(openai_service):
-    """Test parsing a JSON response from the OpenAI API."""
-    # Create a test response
-    response_json = [
-        {
-            "filename": "site.yml",
-            "content": "---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role",
-            "path": "."
-        },
-        {
-            "filename": "tasks.yml",
-            "content": "---\n- name: Install package\n  apt:\n    name: nginx\n    state: present",
-            "path": "roles/example_role/tasks"
-        }
-    ]
-    response_content = json.dumps(response_json)
-    
-    # Parse the response
-    files = openai_service._parse_response(response_content)
-    
-    # Check the result
-    assert len(files) == 2
-    assert files[0].filename == "site.yml"
-    assert files[0].content == "---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role"
-    assert files[0].path == "."
-    assert files[1].filename == "tasks.yml"
-    assert files[1].content == "---\n- name: Install package\n  apt:\n    name: nginx\n    state: present"
-    assert files[1].path == "roles/example_role/tasks"
-
-
-def test_parse_response_markdown_json(openai_service):
-    """Test parsing a markdown-formatted JSON response from the OpenAI API."""
-    # Create a test response with markdown formatting
-    response_json = [
-        {
-            "filename": "site.yml",
-            "content": "---\n# Main playbook\n- name: Example playbook\n  hosts: all\n  roles:\n    - example_role",
-            "path": "."
-        },
-        {
-            "filename": "tasks.yml",
-            "content": "---\n- name: Install package\n  apt:\n    name: nginx\n    state: present",
-            "path": "roles/example_role/tasks"
-        }
-    ]
-    response_content = f"```json\n{json.dumps(response_json)}\n```"
-    
-    # Parse the response
-    files = openai_service._parse_response(response_content)
-    
-    # Check the result
-    assert len(files) == 2
-    assert files[0].filename == "site.yml"
-    assert files[0].path == "."
-    assert files[1].filename == "tasks.yml"
-    assert files[1].path == "roles/example_role/tasks"
-
-
-def test_parse_response_error(openai_service):
-    """Test parsing an invalid response from the OpenAI API."""
-    # Create an invalid response
-    response_content = "This is not valid JSON"
-    
-    # Parse the response (should raise an exception)
-    with pytest.raises(ValueError):
-        openai_service._parse_response(response_content)
+@pytest.mark.parametrize(
+    "template, error",
+    [
+        pytest.param("{}", None, id="array"),
+        pytest.param('{{"files": {}}}', None, id="json_object"),
+        pytest.param("This is not valid JSON", ValueError, id="invalid"),
+    ],
+)
+def test_parse_response(openai_service, example_playbook_json, example_playbook_files, template, error):
+    """Test parsing responses from the OpenAI API, as an array, a JSON mode object or invalid JSON."""
+    content = template.format(example_playbook_json)
+    
+    if error is not None:
+        with pytest.raises(error):
+            openai_service._parse_response(content)
+    else:
+        assert openai_service._parse_response(content) == example_playbook_files